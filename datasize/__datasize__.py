@@ -1,4 +1,10 @@
+from array import array
+from bisect import bisect_right
+from collections import namedtuple, OrderedDict
+from decimal import Decimal
 from math import ceil
+from numbers import Real
+from operator import index
 import sys
 
 
@@ -30,14 +36,418 @@ else:
     __DataSize_super__ = int
 
 
-# find the index of the first non-numeric or decimal character in a raw DataSize string
-_str_unit_index = lambda _s: (max((_s.rfind(n) for n in list(map(str,range(10))) + ['.'])) + 1)
+# numeric DataSize specs, dispatched on in DataSize.__new__()
+_integer_types = (int, __DataSize_super__)
+_real_types = (float, Decimal, Real)
 
-# partition raw DataSize string into decimal string and data size unit abbreviation
-_str_partition = lambda _s: (_s[:_str_unit_index(_s)], _s[_str_unit_index(_s):])
+# integers beyond this magnitude may not survive a round trip through float
+_float_mantissa_limit = 2**53
+
+# decimal places for exact formatting of fractions that do not terminate
+_max_exact_places = 30
+
+# characters that may appear in the numeric part of a raw DataSize string
+_decimal_chars = '0123456789.'
+# characters that float() may accept in a number ending in a decimal char
+_number_chars = frozenset('0123456789.+-eE_')
+
+_buffer_types = (bytes, bytearray, memoryview)
+
+def _is_text_buffer(spec):
+    '''whether spec supports the buffer protocol with byte sized items'''
+    try:
+        return memoryview(spec).itemsize == 1
+    except TypeError:
+        return False
+
+def _decode_ascii(spec):
+    '''str of the ASCII characters in a bytes-like spec, decoded straight
+    from its buffer, so that a memoryview slice is never copied to bytes
+    first'''
+    try:
+        return str(spec, 'ascii')
+    except TypeError:
+        # Python 2 str() takes no encoding, and it is bytes already
+        text = memoryview(spec).tobytes()
+        return text if isinstance(text, str) else text.decode('ascii')
+
+def _str_partition(_s):
+    '''partition raw DataSize string into decimal string and data size unit
+    abbreviation at the character following the last digit or decimal point.
+    Only the unit suffix is scanned, right to left.
+    '''
+    end = len(_s)
+    while end and _s[end - 1] not in _decimal_chars:
+        end -= 1
+    return _s[:end], _s[end:]
+
+def _ceil_exact(raw_size, multiple, divisor=1):
+    '''ceil(raw_size * multiple / divisor) for a decimal string raw_size,
+    computed in integer arithmetic so that no precision is lost to float.
+    Plain digit strings never leave int; signs and exponents go through
+    Fraction, imported only then.
+    '''
+    if raw_size.isdigit():
+        numerator, denominator = int(raw_size), divisor
+    else:
+        whole, _, fraction = raw_size.partition('.')
+        if ((whole or fraction) and (whole.isdigit() or not whole)
+                and (fraction.isdigit() or not fraction)):
+            numerator = int(whole + fraction)
+            denominator = divisor * 10**len(fraction)
+        else:
+            from fractions import Fraction
+            quotient = Fraction(raw_size)
+            numerator = quotient.numerator
+            denominator = divisor * quotient.denominator
+    return -(-numerator * multiple // denominator)
+
+def _compile_unit_table(prefixes, bit_suffix='b', byte_suffix='B', strict=False):
+    '''map every unit abbreviation accepted by the parser to a
+    (multiple, is_bits) pair, so a parse resolves its unit with a single
+    dict lookup. strict raises ValueError when two prefixes spell the
+    same unit with different meanings.
+    '''
+    table = {'': (1, False), byte_suffix: (1, False), bit_suffix: (1, True)}
+    for prefix, multiple in sorted(prefixes.items()):
+        for unit, entry in ((prefix, (multiple, False)),
+                            (prefix + byte_suffix, (multiple, False)),
+                            (prefix + bit_suffix, (multiple, True))):
+            if strict and table.get(unit, entry) != entry:
+                raise ValueError("unit '{}' is ambiguous: {} or {}".format(
+                    unit, table[unit], entry))
+            table[unit] = entry
+    return table
 
 _map_rev = lambda _Dict_: dict(((v,k) for k,v in _Dict_.items()))
 
+CacheInfo = namedtuple('CacheInfo', 'hits misses evictions maxsize currsize')
+
+class ParseCache(object):
+    '''Bounded LRU memo of parsed string specs, keyed on (spec, class, exact).
+    DataSize instances are immutable, so a hit hands back the very same
+    instance that the first parse produced.
+
+    The cache is off while maxsize is 0 (the default):
+        DataSize.parse_cache.enable(maxsize=1024)
+        DataSize.parse_cache.info()
+        DataSize.parse_cache.clear()
+        DataSize.parse_cache.disable()
+    '''
+    def __init__(self, maxsize=0):
+        self.maxsize = 0
+        self._entries = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+        self.enable(maxsize)
+
+    def enable(self, maxsize=1024):
+        '''turn the cache on, or resize it, evicting least recently used
+        entries beyond maxsize. A maxsize of 0 turns the cache off.
+        '''
+        maxsize = int(maxsize)
+        if maxsize < 0:
+            raise ValueError("cache maxsize must not be negative: {}".format(maxsize))
+        self.maxsize = maxsize
+        self._evict()
+
+    def disable(self):
+        '''turn the cache off and drop its entries'''
+        self.enable(0)
+
+    def clear(self):
+        '''drop all entries and reset the counters'''
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions,
+                         self.maxsize, len(self._entries))
+
+    def get(self, key):
+        '''cached instance for key, or None'''
+        try:
+            # re-insert to mark the entry most recently used
+            value = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._evict()
+
+    def _evict(self):
+        entries = self._entries
+        while len(entries) > self.maxsize:
+            try:
+                entries.popitem(last=False)
+            except KeyError: # emptied concurrently
+                break
+            self.evictions += 1
+
+
+InternInfo = namedtuple('InternInfo', 'hits misses hit_rate currsize')
+
+class InternTable(object):
+    '''Flyweight table of shared DataSize instances for common values.
+    While enabled, every DataSize (of the default word_length) whose value
+    is in the table is that one shared instance, so large collections of
+    round sizes like 4KiB or 1GB cost a pointer each instead of an object.
+
+    The table is off by default:
+        DataSize.interning.enable()   # k * 1024**n and k * 1000**n
+        DataSize.interning.info()
+        DataSize.interning.disable()
+    '''
+    def __init__(self):
+        self.instances = None
+        self.hits = self.misses = 0
+        # constructor of new instances, see DataSize.__new__()
+        self.new = __DataSize_super__.__new__
+
+    def enable(self, multipliers=1024, exponents=6, values=()):
+        '''share one instance for each k * 1024**n and k * 1000**n, with
+        0 <= k <= multipliers and 0 <= n <= exponents, and for any extra
+        values (byte counts or specs). Re-enabling replaces the table.
+        '''
+        multipliers, exponents = int(multipliers), int(exponents)
+        if multipliers < 0 or exponents < 0:
+            raise ValueError("multipliers and exponents must not be negative: {}, {}".format(
+                multipliers, exponents))
+        counts = set(int(DataSize(value)) for value in values)
+        for base in (1024, 1000):
+            for exponent in range(exponents + 1):
+                denomination = base ** exponent
+                counts.update(k * denomination for k in range(multipliers + 1))
+        new = __DataSize_super__.__new__
+        self.instances = dict((count, new(DataSize, count)) for count in counts)
+        self.new = self._shared
+
+    def disable(self):
+        '''stop interning and drop the table'''
+        self.instances = None
+        self.new = __DataSize_super__.__new__
+
+    def clear(self):
+        '''reset the counters'''
+        self.hits = self.misses = 0
+
+    def info(self):
+        lookups = self.hits + self.misses
+        return InternInfo(self.hits, self.misses,
+                          float(self.hits) / lookups if lookups else 0.0,
+                          len(self.instances or ()))
+
+    def _shared(self, cls, value):
+        '''the shared instance for value if there is one, else a new one'''
+        instances = self.instances
+        if instances is not None and cls is DataSize:
+            instance = instances.get(value)
+            if instance is not None:
+                self.hits += 1
+                return instance
+            self.misses += 1
+        return __DataSize_super__.__new__(cls, value)
+
+
+class TypedArithmetic(object):
+    '''Opt-in DataSize results from integer arithmetic. While enabled,
+    + - * // % (and their reflected forms, so sum() too), unary minus and
+    abs() of a DataSize return a DataSize of the same class, built straight
+    from the integer result without any of the DataSize() spec handling.
+
+    Off by default, where arithmetic returns plain int:
+        DataSize.arithmetic.enable()
+        DataSize.arithmetic.disable()
+    '''
+    operators = ('__add__', '__radd__', '__sub__', '__rsub__', '__mul__', '__rmul__',
+                 '__floordiv__', '__rfloordiv__', '__mod__', '__rmod__',
+                 '__neg__', '__abs__')
+
+    def __init__(self):
+        self.enabled = False
+
+    def enable(self):
+        for name in self.operators:
+            setattr(DataSize, name, _typed(getattr(__DataSize_super__, name),
+                                           DataSize.interning))
+        self.enabled = True
+
+    def disable(self):
+        for name in self.operators:
+            if name in DataSize.__dict__:
+                delattr(DataSize, name)
+        self.enabled = False
+
+
+def _typed(operation, interning):
+    '''int operation as a DataSize method returning the class of self,
+    constructed through interning.new()'''
+    if operation.__name__ in ('__neg__', '__abs__'):
+        def method(self):
+            return interning.new(self.__class__, operation(self))
+    else:
+        def method(self, other):
+            value = operation(self, other)
+            if value is NotImplemented:
+                return value
+            return interning.new(self.__class__, value)
+    method.__name__ = operation.__name__
+    method.__doc__ = operation.__doc__
+    return method
+
+
+def _dialect_parsers(parse):
+    '''_parse() and _try_parse() class methods around the parse function
+    of a dialect'''
+    def _parse(cls, spec, exact=False):
+        return parse(spec, exact)
+
+    def _try_parse(cls, spec, exact=False):
+        try:
+            return parse(spec, exact)
+        except (ValueError, ArithmeticError) as err:
+            return InvalidSpec(spec, None, str(err))
+
+    return classmethod(_parse), classmethod(_try_parse)
+
+
+class DialectRegistry(object):
+    '''Named unit systems ("dialects") that DataSize can parse and format.
+
+    Registering a dialect compiles its units, once, into a DataSize
+    subclass with its own unit table, shared by the parser, the formatter
+    (fixed unit codes), scan() and expr. Tables are never changed after
+    they are compiled: registering again builds a new class and table.
+    A parse looks its unit up in the one table of the one dialect it
+    selects, so its cost does not depend on how many are registered.
+
+        disk = DataSize.dialects.register('disk', units={'sector': 512})
+        DataSize('8sector', dialect='disk')   # or disk('8sector')
+
+    'datasize' is DataSize itself, the default. The size syntaxes of other
+    tools are registered by datasize.dialects, which is imported the first
+    time a dialect other than 'datasize' is registered or looked up.
+    '''
+    def __init__(self):
+        self._dialects = {}
+        # modules that register the built-in dialects, not yet imported
+        self._builtins = ('datasize.dialects',)
+
+    def _load_builtins(self):
+        '''import the modules that register the built-in dialects, once'''
+        modules, self._builtins = self._builtins, ()
+        for module in modules:
+            __import__(module)
+
+    def register(self, name, prefixes=None, units=None, base='datasize', replace=False,
+                 parse=None):
+        '''compile a dialect and register it under name. Returns its class.
+
+        prefixes: unit prefix -> multiple, each accepted alone and with the
+                  bit and byte suffixes, like {'Ki': 1024}; these override
+                  the prefixes of base, like JEDEC {'K': 1024}
+        units:    whole unit -> multiple, in bytes, or (multiple, is_bits),
+                  like {'sector': 512}
+        base:     name of the dialect to extend, or None to start from
+                  bytes and bits alone
+        replace:  allow replacing a dialect of the same name
+        parse:    function(spec, exact) -> byte count for a dialect with a
+                  syntax of its own; its table then holds just the units
+                  given, for the formatter, scan() and expr to agree with it
+
+        Raises ValueError if one unit would mean two different multiples.
+        '''
+        self._load_builtins()
+        if name in self._dialects and not replace:
+            raise ValueError("dialect '{}' is already registered".format(name))
+        if base is None:
+            parent = DataSize
+            parse_prefixes, whole_units = {}, {}
+            unit_prefixes = dict(DataSize.unit_prefixes)
+        else:
+            parent = self[base]
+            parse_prefixes = dict(parent._parse_prefixes)
+            unit_prefixes = dict(parent.unit_prefixes)
+            whole_units = dict(parent._whole_units)
+        prefixes = dict(prefixes or {})
+        parse_prefixes.update(prefixes)
+        unit_prefixes.update(prefixes)
+        for unit, multiple in (units or {}).items():
+            whole_units[unit] = multiple if isinstance(multiple, tuple) else (multiple, False)
+
+        if parse is not None:
+            table = {'': (1, False)}
+        else:
+            try:
+                table = _compile_unit_table(parse_prefixes, parent.bit_suffix,
+                                            parent.byte_suffix, strict=True)
+            except ValueError as err:
+                raise ValueError("dialect '{}' {}".format(name, err))
+        for unit, entry in whole_units.items():
+            if table.get(unit, entry) != entry:
+                raise ValueError("dialect '{}' unit '{}' is ambiguous: {} or {} bytes".format(
+                    name, unit, table[unit][0], entry[0]))
+            table[unit] = entry
+
+        dialect = type(parent)(str('DataSize'), (DataSize,), {
+            '__slots__': (),
+            '__module__': DataSize.__module__,
+            '__qualname__': "DataSize.dialects['{}']".format(name),
+            'dialect': name,
+            'unit_prefixes': unit_prefixes,
+            '_parse_prefixes': parse_prefixes,
+            '_whole_units': whole_units,
+            '_unit_table': table,
+        })
+        if parse is not None:
+            dialect._parse, dialect._try_parse = _dialect_parsers(parse)
+        self._dialects[name] = dialect
+        return dialect
+
+    def unregister(self, name):
+        '''forget the dialect name; values already parsed keep working'''
+        if name == 'datasize':
+            raise ValueError("the 'datasize' dialect cannot be unregistered")
+        self[name]
+        del self._dialects[name]
+
+    def get(self, name, default=None):
+        if name not in self._dialects:
+            self._load_builtins()
+        return self._dialects.get(name, default)
+
+    def __getitem__(self, name):
+        if name not in self._dialects:
+            self._load_builtins()
+        try:
+            return self._dialects[name]
+        except KeyError:
+            raise KeyError("unknown dialect: '{}'".format(name))
+
+    def __contains__(self, name):
+        if name not in self._dialects:
+            self._load_builtins()
+        return name in self._dialects
+
+    def __iter__(self):
+        self._load_builtins()
+        return iter(sorted(self._dialects))
+
+    def __len__(self):
+        self._load_builtins()
+        return len(self._dialects)
+
+
+# why a spec could not be parsed, see DataSize.try_parse(); position is
+# the index of the first offending character, or None for the whole spec
+InvalidSpec = namedtuple('InvalidSpec', 'spec position reason')
+# a row that DataSize.parse_many() could not parse
+ParseFailure = namedtuple('ParseFailure', 'index spec position reason')
+
 class DataSize(__DataSize_super__):
     '''Integer subclass that handles units appropriate for data allocation.
     https://www.iso.org/standard/31898.html
@@ -58,10 +468,12 @@ class DataSize(__DataSize_super__):
 
     Arithmetic methods inherit directly from int, and return int. This
       keeps this class smaller, and avoids unecessary constructor overhead.
+      DataSize.arithmetic.enable() opts in to DataSize results instead.
 
     WARNING: in Python 2, DataSize is a subclass of long to avoid overflows
       on large values. Upgrade!
     '''
+    __slots__ = ()  # no per-instance __dict__, see _variant()
     word_length = 8  # defaults to octet = byte for conversion to/from bits
     bit_suffix, byte_suffix = 'b', 'B'
 
@@ -123,6 +535,16 @@ class DataSize(__DataSize_super__):
         (m for m in IEC_prefixes.values()),
         (k[0].lower() for k in IEC_prefixes.keys())))
 
+    # every unit abbreviation accepted by the parser, resolved once here
+    # rather than on each parse. Standard prefixes take precedence over
+    # nonstandard ones.
+    _parse_prefixes = nonstandard_prefixes.copy()
+    _parse_prefixes.update(unit_prefixes)
+    _unit_table = _compile_unit_table(_parse_prefixes, bit_suffix, byte_suffix)
+    # whole units of a registered dialect, like 'sector', see DialectRegistry
+    _whole_units = {}
+    dialect = 'datasize'
+
     _auto_fmt_modes = {
         'a': {
             'description': "default autoformat",
@@ -149,9 +571,33 @@ class DataSize(__DataSize_super__):
             'suffix_rpad_spaces': 3,
         }
     }
+    # sorted denomination tables for unit selection, see Formatter.select()
+    for _fmt_mode in _auto_fmt_modes.values():
+        _fmt_mode['denominations'] = sorted(_fmt_mode['prefix_units'])
+        # as the float arithmetic of __format__() sees them
+        _fmt_mode['selection_bounds'] = [
+            int(float(d)) for d in _fmt_mode['denominations']]
+        _fmt_mode['binary'] = _fmt_mode['denominations'] == [
+            1024**n for n in range(1, len(_fmt_mode['denominations']) + 1)]
+    del _fmt_mode
+
+
+    # parse decimal fractions in exact integer arithmetic rather than float.
+    # Integer quantities like '14GiB' are always parsed exactly.
+    exact_parsing = False
+
+    # format in exact integer arithmetic rather than float, rounding values
+    # to the precision of the format code 'half_even' or by 'ceiling'
+    exact_formatting = False
+    format_rounding = 'half_even'
 
+    # optional LRU memo of string parses, off by default
+    parse_cache = ParseCache()
+    interning = InternTable()
+    arithmetic = TypedArithmetic()
+    dialects = DialectRegistry()
 
-    def __init__(self, spec, word_length=8): # pylint: disable=W0231,W0613
+    def __init__(self, spec, word_length=8, exact=None, dialect=None): # pylint: disable=W0231,W0613
         '''Usage:
         min_heap = DataSize('768Mib')
         max_heap = DataSize('2G')
@@ -162,55 +608,329 @@ class DataSize(__DataSize_super__):
 
         Optional keyword argument 'word_length' can be used
         to specify some other bits per byte than the default of 8.
+
+        Optional keyword argument 'exact' parses fractional quantities like
+        '1.1YiB' without float rounding (default: DataSize.exact_parsing).
+
+        Optional keyword argument 'dialect' parses with the units of a
+        dialect registered in DataSize.dialects, see DialectRegistry.
+        Instances with a word_length other than 8 belong to a cached
+        subclass that carries it as a class attribute; DataSize keeps no
+        per-instance __dict__.
         '''
-        self.word_length = int(word_length)
 
 
     def __new__(subclass, spec, **kwargs):
         '''Because DataSize is a subclass of int, we must override __new__()
         to implement a string decoder that can provide an immutable integer
         value for instances.
+
+        spec is dispatched on its type: str and ASCII bytes-like objects
+        (bytes, bytearray, memoryview, mmap, ...) are parsed,
+        int, float, Decimal, Fraction and other real numbers count words of
+        word_length bits, rounded up to whole bytes, and any other object
+        is accepted if it implements __index__.
         '''
+        dialect = kwargs.get('dialect')
+        if dialect is not None:
+            subclass = DataSize.dialects[dialect]
         word_length = int(kwargs.get('word_length', DataSize.word_length))
-        unit = 'bytes'
-        multiple = 1
+        if word_length == subclass.word_length:
+            target = subclass
+        else:
+            target = subclass._variant(word_length)
+        spec_type = type(spec)
+        if spec_type is not str and spec_type in _buffer_types:
+            spec, spec_type = _decode_ascii(spec), str
+
+        if spec_type is str:
+            exact = kwargs.get('exact')
+            if exact is None:
+                exact = target.exact_parsing
+            cache = DataSize.parse_cache
+            if not cache.maxsize:
+                return DataSize.interning.new(
+                    target, target._parse(spec, exact))
+            key = (spec, target, bool(exact))
+            instance = cache.get(key)
+            if instance is None:
+                instance = DataSize.interning.new(
+                    target, target._parse(spec, exact))
+                cache.put(key, instance)
+            return instance
 
-        if '__floordiv__' not in dir(spec):
+        if spec_type in _integer_types or isinstance(spec, _integer_types):
+            value = spec
+        elif isinstance(spec, _real_types):
+            return DataSize.interning.new(
+                target, -(-ceil(word_length * spec) // 8))
+        elif isinstance(spec, str):
+            return subclass(str(spec), **kwargs)
+        elif isinstance(spec, _buffer_types):
+            return subclass(_decode_ascii(spec), **kwargs)
+        else:
+            try:
+                value = index(spec)
+            except TypeError:
+                if not _is_text_buffer(spec):
+                    raise TypeError("DataSize() spec must be a string, bytes-like object "
+                                    "or a number, not '{}'".format(spec_type.__name__))
+                return subclass(_decode_ascii(spec), **kwargs)
 
-            _raw_size, _raw_unit = _str_partition(spec.strip())
+        if word_length != 8:
+            # spec counts words of some other bit length; round up to bytes
+            value = -(-(word_length * value) // 8)
+        return DataSize.interning.new(target, value)
 
-            if _raw_unit and _raw_unit[-1] == DataSize.bit_suffix:
-                unit = 'bits'
-            _raw_unit = _raw_unit.rstrip(''.join((DataSize.bit_suffix, DataSize.byte_suffix)))
+    # subclasses carrying other word lengths, see _variant()
+    _variants = {}
 
-            prefixes = {}
-            prefixes.update(DataSize.nonstandard_prefixes)
-            prefixes.update(DataSize.unit_prefixes)
+    @classmethod
+    def _variant(cls, word_length):
+        '''subclass of cls with another class level word_length, so that
+        instances never need a __dict__ to carry one'''
+        cls = cls.__dict__.get('_variant_of', cls)
+        if word_length == cls.word_length:
+            return cls
+        key = (cls, word_length)
+        try:
+            return DataSize._variants[key]
+        except KeyError:
+            pass
+        variant = DataSize._variants[key] = type(cls)(cls.__name__, (cls,), {
+            '__slots__': (),
+            '__module__': cls.__module__,
+            '__qualname__': getattr(cls, '__qualname__', cls.__name__),
+            'word_length': word_length,
+            '_variant_of': cls,
+        })
+        return variant
 
-            if _raw_unit == '':
-                #assume bytes if no unit is given
-                multiple = 1
-            else:
-                try:
-                    multiple = prefixes[_raw_unit]
-                except KeyError:
-                    raise ValueError("'{}' invalid unit: '{}'".format(spec, _raw_unit)) #pylint disable=W0707
-
-            raw_number = float(_raw_size)
-            if unit == 'bits':
-                bits = raw_number * multiple
-                value = __bits_to_bytes__(bits)
-            else:
-                bits = raw_number * word_length * multiple
-                value = raw_number * multiple
+    def __reduce__(self):
+        cls, word_length = _class_key(type(self))
+        return (_restore, (cls, __DataSize_super__(self), word_length))
+
+    def __setstate__(self, state):
+        # pickles of releases before __slots__ carry {'word_length': n}
+        word_length = int(state.get('word_length', self.word_length))
+        if word_length != self.word_length:
+            self.__class__ = type(self)._variant(word_length)
+
+    @classmethod
+    def from_bytes(cls, n, *args, **kwargs):
+        '''DataSize of n bytes, skipping all string handling. Non integer
+        counts are rounded up to the nearest byte.
+
+        The int.from_bytes(bytes, byteorder) form is still accepted, and
+        decodes n as an integer.
+        '''
+        if args or kwargs or isinstance(n, (bytes, bytearray, memoryview)):
+            n = __DataSize_super__.from_bytes(n, *args, **kwargs)
+        elif not isinstance(n, _integer_types):
+            n = ceil(n)
+        return DataSize.interning.new(cls, n)
+
+    @classmethod
+    def from_bits(cls, n, word_length=8):
+        '''DataSize holding n bits, rounded up to whole words of word_length
+        bits, skipping all string handling.
+        '''
+        word_length = int(word_length)
+        if isinstance(n, _integer_types):
+            value = -(-n // word_length)
+        else:
+            value = ceil(n / word_length)
+        return DataSize.interning.new(cls._variant(word_length), value)
+
+    @classmethod
+    def sum(cls, sizes, start=0):
+        '''total of sizes as a DataSize. Unlike sum(), this adds plain
+        integers even while DataSize.arithmetic is enabled.
+        '''
+        total = sum(map(__DataSize_super__.__index__, sizes), index(start))
+        return DataSize.interning.new(cls, total)
+
+    @classmethod
+    def parse_many(cls, specs, output='list', errors='raise', exact=None):
+        '''parse an iterable of specs in one pass, where each distinct spec
+        is parsed only once per call. Returns a list of DataSize by default.
+
+        output: 'list'  list of DataSize
+                'int'   list of int byte counts
+                'array' array('Q') of byte counts
+        errors: 'raise'   raise on the first bad spec (default)
+                'skip'    leave bad specs out of the results
+                'collect' return (results, failures), where failures is a
+                          list of ParseFailure(index, spec, position, reason)
+        Bad specs are detected without raising in the 'skip' and 'collect'
+        modes, see try_parse().
 
-            if isinstance(value, float):
-                value = ceil(value)
+        >>> DataSize.parse_many(['512MiB', '1GiB', '512MiB'], output='int')
+        [536870912, 1073741824, 536870912]
+        '''
+        if errors not in ('raise', 'skip', 'collect'):
+            raise ValueError("errors must be 'raise', 'skip' or 'collect': '{}'".format(errors))
+        if exact is None:
+            exact = cls.exact_parsing
+        # bad specs come back as InvalidSpec records unless errors is 'raise'
+        parse = cls._parse if errors == 'raise' else cls._try_parse
+
+        def count(spec):
+            if type(spec) is str:
+                return parse(spec, exact)
+            if errors == 'raise':
+                return cls(spec, exact=exact)
+            size, invalid = cls.try_parse(spec, exact=exact)
+            return invalid or size
+
+        if output == 'list':
+            results = []
+            new = DataSize.interning.new
+            def convert(spec):
+                value = count(spec)
+                if type(value) is InvalidSpec:
+                    return value
+                return new(cls, value)
+        elif output in ('int', 'array'):
+            results = [] if output == 'int' else array('Q')
+            def convert(spec):
+                value = count(spec)
+                if type(value) is InvalidSpec:
+                    return value
+                if output == 'array' and not 0 <= value < 2**64:
+                    if errors == 'raise':
+                        raise OverflowError("'{}' does not fit array('Q')".format(spec))
+                    return InvalidSpec(spec, None, "does not fit array('Q')")
+                return __DataSize_super__(value)
+        else:
+            raise ValueError("output must be 'list', 'int' or 'array': '{}'".format(output))
+
+        append = results.append
+        memo = {}
+        failures = []
+        for position, spec in enumerate(specs):
+            try:
+                value = memo[spec]
+            except KeyError:
+                value = memo[spec] = convert(spec)
+            except TypeError:
+                # unhashable, so not memoized
+                value = convert(spec)
+            if type(value) is InvalidSpec:
+                if errors == 'collect':
+                    failures.append(ParseFailure(position, *value))
+                continue
+            append(value)
+
+        if errors == 'collect':
+            return results, failures
+        return results
+
+    @classmethod
+    def _parse(cls, spec, exact=False):
+        '''byte count of a string spec like "14GiB"'''
+        _raw_size, _raw_unit = _str_partition(spec.strip())
+        try:
+            multiple, is_bits = cls._unit_table[_raw_unit]
+        except KeyError:
+            multiple, is_bits = cls._resolve_unit(spec, _raw_unit)
+
+        if _raw_size.isdigit():
+            # integer quantities are exact, and never touch float
+            value = int(_raw_size) * multiple
+            if is_bits:
+                value = -(-value // 8)
+        elif exact:
+            value = _ceil_exact(_raw_size, multiple, 8 if is_bits else 1)
+        elif is_bits:
+            value = __bits_to_bytes__(float(_raw_size) * multiple)
         else:
-            # spec is a number, not a string, so just assume bytes
-            value = ceil(ceil(word_length * spec) / 8)
+            value = ceil(float(_raw_size) * multiple)
+        return value
+
+    @classmethod
+    def _resolve_unit(cls, spec, raw_unit):
+        '''slow path for unit abbreviations missing from the compiled table,
+        like repeated base unit suffixes ('KBB'). Raises ValueError for
+        unknown units.
+        '''
+        unit = cls._find_unit(raw_unit)
+        if unit is None:
+            prefix = raw_unit.rstrip(''.join((cls.bit_suffix, cls.byte_suffix)))
+            raise ValueError("'{}' invalid unit: '{}'".format(spec, prefix))
+        return unit
+
+    @classmethod
+    def _find_unit(cls, raw_unit):
+        '''(multiple, is_bits) of a unit missing from the compiled table, or
+        None if it is unknown'''
+        is_bits = bool(raw_unit) and raw_unit[-1] == cls.bit_suffix
+        prefix = raw_unit.rstrip(''.join((cls.bit_suffix, cls.byte_suffix)))
+        entry = cls._unit_table.get(prefix)
+        if entry is None:
+            return None
+        return entry[0], is_bits
+
+    @classmethod
+    def try_parse(cls, spec, exact=None, **kwargs):
+        '''parse spec without raising: returns (DataSize, None), or
+        (None, InvalidSpec(spec, position, reason)) when spec is bad.
+
+        String and bytes-like specs are checked without raising and
+        catching exceptions internally, so junk costs no more than a good
+        spec. Other specs go through DataSize().
+
+        >>> DataSize.try_parse('12 GB')
+        (None, InvalidSpec(spec='12 GB', position=2, reason="invalid unit: ' GB'"))
+        '''
+        if kwargs.get('dialect') is not None:
+            cls = DataSize.dialects[kwargs.pop('dialect')]
+        if exact is None:
+            exact = cls.exact_parsing
+        if type(spec) is not str and isinstance(spec, _buffer_types):
+            try:
+                spec = _decode_ascii(spec)
+            except UnicodeDecodeError as err:
+                return None, InvalidSpec(spec, err.start, 'not ASCII')
+        if type(spec) is not str:
+            try:
+                return cls(spec, exact=exact, **kwargs), None
+            except (ValueError, TypeError, OverflowError) as err:
+                return None, InvalidSpec(spec, None, str(err))
+        value = cls._try_parse(spec, exact)
+        if type(value) is InvalidSpec:
+            return None, value
+        word_length = int(kwargs.get('word_length', cls.word_length))
+        if word_length != cls.word_length:
+            cls = cls._variant(word_length)
+        return DataSize.interning.new(cls, value), None
 
-        return __DataSize_super__.__new__(DataSize, value)
+    @classmethod
+    def _try_parse(cls, spec, exact=False):
+        '''byte count of a string spec like _parse(), or an InvalidSpec
+        record. Common junk is caught by inspection rather than by raising.
+        '''
+        stripped = spec.strip()
+        start = len(spec) - len(spec.lstrip())
+        _raw_size, _raw_unit = _str_partition(stripped)
+        unit = cls._unit_table.get(_raw_unit) or cls._find_unit(_raw_unit)
+        if unit is None:
+            return InvalidSpec(spec, start + len(_raw_size),
+                               "invalid unit: '{}'".format(_raw_unit))
+        if _raw_size.isdigit():
+            value = int(_raw_size) * unit[0]
+            return -(-value // 8) if unit[1] else value
+        if not _raw_size:
+            return InvalidSpec(spec, start, 'missing number')
+        for offset, char in enumerate(_raw_size):
+            if char not in _number_chars:
+                return InvalidSpec(spec, start + offset,
+                                   "invalid number: '{}'".format(_raw_size))
+        try:
+            # rare: right characters, wrong syntax ('1.2.3')
+            return cls._parse(stripped, exact)
+        except (ValueError, ArithmeticError) as err:
+            return InvalidSpec(spec, start, str(err))
 
     def __format__(self, code):
         '''formats as a decimal number, but recognizes data units as type
@@ -236,11 +956,49 @@ class DataSize(__DataSize_super__):
                 DataSize('750GB'),DataSize(DataSize('750GB') * 0.8))
         'My new 750GB SSD really only stores 558.79GiB of data.'
         '''
-        _given_code = code[:]
+        return self.formatter(code)(self)
+
+    # compiled Formatter for each format code seen by __format__()
+    _formatters = {}
+    _formatters_maxsize = 256
+
+    @classmethod
+    def formatter(cls, code='', exact=None, rounding=None):
+        '''compiled Formatter for a __format__() code, for formatting many
+        values with one code without parsing it each time:
+        >>> gib = DataSize.formatter('.2GiB')
+        >>> gib(DataSize('750GB'))
+        '698.49GiB'
+
+        exact formats in integer arithmetic instead of float, rounding
+        'half_even' or 'ceiling' (defaults: DataSize.exact_formatting and
+        DataSize.format_rounding).
+        '''
+        if exact is None:
+            exact = cls.exact_formatting
+        if rounding is None:
+            rounding = cls.format_rounding
+        key = (cls, code, exact, rounding)
+        try:
+            return cls._formatters[key]
+        except KeyError:
+            pass
+        if len(cls._formatters) >= cls._formatters_maxsize:
+            cls._formatters.clear()
+        compiled = cls._formatters[key] = Formatter(code, cls, exact, rounding)
+        return compiled
+
+    @classmethod
+    def _format_unit(cls, code, size):
+        '''first stage of __format__(): eat the unit from the format code,
+        choosing the unit by size for the autoformat modes. Returns
+        (code, bits, prefix, denomination, base_unit, suffix_rpad_spaces),
+        where code is the remaining padding and precision spec.
+        '''
         base_unit = 'B'
+        bits = False
         prefix = ''
         denomination = 1
-        multiple = 1
         fprecision = 0 # default no fp precision format code
         suffix_rpad_spaces = 0
 
@@ -251,11 +1009,10 @@ class DataSize(__DataSize_super__):
             base_unit = code[-1]
             suffix_rpad_spaces += 1
             code = code[:-1]  # eat the base unit
-            if base_unit == 'b':
-                multiple = self.word_length
+            bits = base_unit == 'b'
 
-        if code and code[-1] in self._auto_fmt_modes:
-            fmt_mode = self._auto_fmt_modes[code[-1]]
+        if code and code[-1] in cls._auto_fmt_modes:
+            fmt_mode = cls._auto_fmt_modes[code[-1]]
             if code[-1] == 'A' and base_unit != 'b':
                 base_unit = ''
 
@@ -264,7 +1021,7 @@ class DataSize(__DataSize_super__):
             denominations.sort(reverse=True)
 
             for quantity in denominations:
-                if float(self) / float(quantity) >= 1.0:
+                if float(size) / float(quantity) >= 1.0:
                     prefix = fmt_mode['prefix_units'][quantity]
                     prefix_offset = len(prefix)
                     if code[-prefix_offset:] == prefix:
@@ -283,7 +1040,7 @@ class DataSize(__DataSize_super__):
 
         else:
             # get a list of unit prefixes sorted by size, ascending
-            _units_prefixes = [(v,k) for k,v in self.unit_prefixes.items()]
+            _units_prefixes = [(v,k) for k,v in cls.unit_prefixes.items()]
             _units_prefixes.sort()
             units = [v for k,v in _units_prefixes]
             for prefix in units:
@@ -291,13 +1048,18 @@ class DataSize(__DataSize_super__):
                 if code[-prefix_offset:] == prefix:
                     suffix_rpad_spaces += prefix_offset
                     code = code[:-prefix_offset]
-                    denomination = self.unit_prefixes[prefix]
+                    denomination = cls.unit_prefixes[prefix]
                     break
                 prefix, denomination = '', 1
 
-        value = float(self * multiple)/float(denomination)
+        return code, bits, prefix, denomination, base_unit, suffix_rpad_spaces
 
-        if value.is_integer():  # emit integers if we can do it cleanly
+    @staticmethod
+    def _format_template(code, integer, unit, suffix_rpad_spaces, _given_code):
+        '''second stage of __format__(): build the template and cast for a
+        value in the chosen unit, given whether that value is integer
+        '''
+        if integer:  # emit integers if we can do it cleanly
             code = code.split('.', 1)[0]  # precision in the code? strip it
             code += 'd'
             cast = lambda x: int(x) #pylint: disable=W0108
@@ -326,10 +1088,213 @@ class DataSize(__DataSize_super__):
             cast = lambda x: x
 
         unit_suffix_template = '{{:<{n}}}'.format(n=suffix_rpad_spaces)
-        unit_output_suffix = unit_suffix_template.format(prefix + base_unit)
+        unit_output_suffix = unit_suffix_template.format(unit)
         format_parms = {'code': code, 'unit': unit_output_suffix}
         template = '{{:{code}}}{unit}'.format(**format_parms)
+        return template, cast
+
+
+# the default dialect
+DataSize.dialects._dialects['datasize'] = DataSize
+
+
+def _restore(cls, value, word_length):
+    '''unpickle a DataSize, see DataSize.__reduce__()'''
+    return __DataSize_super__.__new__(_class_of(cls, word_length), value)
+
+
+def _class_key(cls):
+    '''(class, word_length) of a DataSize class, which pickles, unlike
+    word length variants and dialects, which are not importable by name:
+    the class is DataSize or the name of a registered dialect'''
+    base = cls.__dict__.get('_variant_of', cls)
+    if base is not DataSize and DataSize.dialects.get(base.dialect) is base:
+        base = base.dialect
+    return base, cls.word_length
+
+
+def _class_of(cls, word_length):
+    '''DataSize class of a _class_key()'''
+    if isinstance(cls, str):
+        cls = DataSize.dialects[cls]
+    return cls._variant(word_length)
+
+
+class _FormatUnit(object):
+    '''the unit choice of a Formatter for one denomination, with its
+    templates built on first use'''
+    __slots__ = ('code', 'bits', 'unit', 'denomination', 'exact_denomination',
+                 'suffix_rpad_spaces', 'given_code', 'templates', 'exact_template')
+
+    def __init__(self, given_code, code, bits, prefix, denomination, base_unit,
+                 suffix_rpad_spaces):
+        self.given_code = given_code
+        self.code = code
+        self.bits = bits
+        self.unit = prefix + base_unit
+        self.exact_denomination = denomination
+        self.denomination = float(denomination)
+        self.suffix_rpad_spaces = suffix_rpad_spaces
+        self.templates = {}
+
+    def template(self, integer):
+        '''(template, cast) for values that are integer, or not'''
         try:
-            return template.format(cast(float(value)))
-        except ValueError as err:
-            raise ValueError("Invalid format specifier: '{}' --> {}".format(_given_code, template))
+            return self.templates[integer]
+        except KeyError:
+            pass
+        compiled = self.templates[integer] = DataSize._format_template(
+            self.code, integer, self.unit, self.suffix_rpad_spaces, self.given_code)
+        return compiled
+
+    def exact_format(self, amount, rounding):
+        '''amount (bytes or bits) formatted in this unit, computed with
+        integer arithmetic and rounded to the precision of the template'''
+        denomination = self.exact_denomination
+        whole, remainder = divmod(amount, denomination)
+        if not remainder:
+            return self.render(self.template(True)[0], whole)
+
+        try:
+            template, places, scale, digits, trim = self.exact_template
+        except AttributeError:
+            template, places, scale, digits, trim = self.exact_template = self._exact_template()
+        # whole is floored, so the fraction counts up from it even below zero
+        fraction, remainder = divmod(remainder * scale, denomination)
+        if remainder and (rounding == 'ceiling' or 2 * remainder > denomination or (
+                2 * remainder == denomination and (fraction if places else whole) & 1)):
+            fraction += 1 # half even
+            if fraction == scale:
+                whole, fraction = whole + 1, 0
+        sign = ''
+        if whole < 0:
+            scaled = whole * scale + fraction
+            if scaled < 0:
+                sign = '-'
+                whole, fraction = divmod(-scaled, scale)
+            else:
+                whole = 0
+        if digits is not None:
+            if trim:
+                fraction = str(fraction).rjust(places, '0').rstrip('0')
+            return digits.format(sign, whole, fraction)
+        text = '{}{}.{}'.format(sign, whole, str(fraction).rjust(places, '0'))
+        if trim:
+            return self.render(template, text.rstrip('0'))
+        return self.render(template, Decimal(text))
+
+    def render(self, template, value):
+        '''template formatted with value'''
+        try:
+            return template.format(value)
+        except ValueError:
+            raise ValueError("Invalid format specifier: '{}' --> {}".format(
+                self.given_code, template))
+
+    def _exact_template(self):
+        '''(template, places, scale, digits, trim) for fractional exact
+        values: the places to round to and 10**places; digits, the template
+        of the output from the sign, whole and fraction digits when the code
+        has no padding, or None to format a decimal string (or a Decimal)
+        with the template; and whether to trim trailing zeros, because the
+        code gives no precision'''
+        template = self.template(False)[0]
+        spec = template[2:template.index('}', 2)]
+        precision = spec.rsplit('.', 1)[-1][:-1]
+        if not (spec.endswith('f') and '.' in spec and precision.isdigit()):
+            # no precision: as many places as the value needs
+            places = _terminating_places(self.exact_denomination)
+            if places is None:
+                places = _max_exact_places
+            digits = template.replace('{:}', '{}{}.{}', 1) if not spec else None
+            return template, places, 10**places, digits, True
+        places = int(precision)
+        digits = None
+        if spec == '.{}f'.format(places):
+            # no padding: the rounded digits are the output
+            number = '{}{}.{:0%dd}' % places if places else '{}{}'
+            digits = template.replace('{:' + spec + '}', number, 1)
+        return template, places, 10**places, digits, False
+
+
+def _terminating_places(denominator):
+    '''decimal places after which any fraction over denominator terminates
+    (the larger power of 2 or 5 in it), or None if some do not'''
+    twos = fives = 0
+    while not denominator % 2:
+        denominator //= 2
+        twos += 1
+    while not denominator % 5:
+        denominator //= 5
+        fives += 1
+    return max(twos, fives) if denominator == 1 else None
+
+
+class Formatter(object):
+    '''A DataSize.__format__() code, parsed once and callable on any number
+    of sizes. Get one from DataSize.formatter(code).
+
+    The autoformat modes keep one _FormatUnit per denomination of the mode,
+    each compiled the first time a size selects it.
+
+    Exact formatters compute the value in the chosen unit with integer
+    divmod, and round it to the precision of the code 'half_even' or by
+    'ceiling', so large values are not rounded through float.
+    '''
+    def __init__(self, code='', cls=DataSize, exact=False, rounding='half_even'):
+        if rounding not in ('half_even', 'ceiling'):
+            raise ValueError("rounding must be 'half_even' or 'ceiling': '{}'".format(rounding))
+        self.code = code
+        self.cls = cls
+        self.exact = exact
+        self.rounding = rounding
+        mode_code = (code or 'a')[:-1] if code[-1:] in ('b', 'B') else (code or 'a')
+        mode = cls._auto_fmt_modes.get(mode_code[-1:])
+        # denominations of an autoformat mode, ascending
+        self.denominations = mode['denominations'] if mode else []
+        self._binary = bool(mode) and mode['binary']
+        self._bounds = mode['selection_bounds'] if mode else []
+        if exact:
+            self._bounds = self.denominations
+        self._units = {}
+
+    def unit(self, index):
+        '''_FormatUnit for denominations[index - 1], where index 0 covers
+        sizes below every denomination (and fixed unit codes)'''
+        try:
+            return self._units[index]
+        except KeyError:
+            pass
+        # a size equal to the denomination selects it
+        size = self.denominations[index - 1] if index else 0
+        compiled = self._units[index] = _FormatUnit(
+            self.code, *self.cls._format_unit(self.code, size))
+        return compiled
+
+    def select(self, size):
+        '''unit index for size: how many denominations are <= size.
+
+        Unless the formatter is exact, sizes are compared as the float
+        arithmetic of the formatted value sees them, which only differs
+        from the exact integer above 2**53. Powers of 1024 are then counted
+        from the bit length, and other tables are bisected.
+        '''
+        if not (self.exact or -_float_mantissa_limit < size < _float_mantissa_limit):
+            size = int(float(size))
+        if self._binary:
+            if size < 1:
+                return 0
+            return min((size.bit_length() - 1) // 10, len(self.denominations))
+        return bisect_right(self._bounds, size)
+
+    def __call__(self, size):
+        unit = self.unit(self.select(size) if self.denominations else 0)
+        multiple = getattr(size, 'word_length', DataSize.word_length) if unit.bits else 1
+        if self.exact:
+            return unit.exact_format(size * multiple, self.rounding)
+        value = float(size * multiple)/unit.denomination
+        template, cast = unit.template(value.is_integer())
+        return unit.render(template, cast(float(value)))
+
+    def __repr__(self):
+        return '{}.formatter({!r})'.format(self.cls.__name__, self.code)
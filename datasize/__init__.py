@@ -1 +1,34 @@
 from datasize.__datasize__ import *
+import sys as _sys
+
+# names re-exported from subsystems, which are imported on first use so
+# that import datasize costs no more than DataSize itself
+_lazy = {
+    'DataSizeArray': 'datasize.sizearray',
+    'scan': 'datasize.scanner',
+    'DataRate': 'datasize.rate',
+    'sort_human': 'datasize.sorting',
+}
+# import * still brings in everything, loading the subsystems
+__all__ = sorted(name for name in globals() if not name.startswith('_')) + sorted(_lazy)
+
+
+def __getattr__(name):
+    try:
+        module = _lazy[name]
+    except KeyError:
+        raise AttributeError("module 'datasize' has no attribute '{}'".format(name))
+    __import__(module)
+    value = getattr(_sys.modules[module], name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy))
+
+
+if _sys.version_info < (3, 7):
+    # no module __getattr__ (PEP 562)
+    for _name in _lazy:
+        __getattr__(_name)
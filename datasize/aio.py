@@ -0,0 +1,62 @@
+'''asyncio streaming scan for data size tokens. Requires Python 3.6.
+
+    async for line_no, span, size in datasize.aio.scan(reader):
+        ...
+
+scan() reads an asyncio.StreamReader in large chunks and finds the same
+tokens as datasize.scan(). Small batches of lines are scanned in the
+event loop; batches of more than batch_size lines go to an executor, the
+loop's default thread pool unless another one (a ProcessPoolExecutor,
+say) is given, so that a burst of input never stalls the other tasks.
+A dialect class crosses to a process pool by its name, so its worker
+processes must have it registered too, as they do when they import
+datasize.dialects or are forked.
+'''
+import asyncio
+
+from datasize.__datasize__ import DataSize, _class_key, _class_of
+from datasize.scanner import scan as _scan
+
+
+def _scan_lines(lines, start, cls, exact):
+    '''datasize.scan() of a batch of lines, as a list, for an executor;
+    cls is a _class_key(), which pickles for a process pool'''
+    return list(_scan(lines, cls=_class_of(*cls), exact=exact, start=start))
+
+
+async def scan(reader, chunk_size=1 << 16, batch_size=1024, executor=None,
+               cls=DataSize, exact=None):
+    '''async generator of (line_no, (begin, end), size) for every data size
+    token in the lines read from reader, numbering lines from 1. Spans
+    are byte offsets within the line.
+    '''
+    loop = asyncio.get_event_loop()
+    cls = _class_key(cls)
+    line_no, pending = 1, b''
+    while True:
+        chunk = await reader.read(chunk_size)
+        if chunk:
+            data = pending + chunk
+            cut = data.rfind(b'\n') + 1
+            if not cut:
+                # no complete line yet
+                pending = data
+                continue
+            data, pending = data[:cut - 1], data[cut:]
+        elif pending:
+            data, pending = pending, b''
+        else:
+            return
+
+        # sizes are ASCII; latin-1 keeps spans equal to byte offsets
+        lines = data.decode('latin-1').split('\n')
+        if len(lines) > batch_size:
+            found = await loop.run_in_executor(
+                executor, _scan_lines, lines, line_no, cls, exact)
+        else:
+            found = _scan_lines(lines, line_no, cls, exact)
+        line_no += len(lines)
+        for token in found:
+            yield token
+        # let other tasks run between batches, even when reader is full
+        await asyncio.sleep(0)
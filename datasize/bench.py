@@ -0,0 +1,245 @@
+'''Micro-benchmarks for DataSize hot paths, reported as the best per-call
+cost over several repeats.
+
+    python -m datasize.bench
+'''
+import timeit
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from datasize import DataSize
+
+_setup = 'from datasize import DataSize'
+_sizes = "; sizes = [DataSize(n * 7919 ** (n % 6)) for n in range(10000)]"
+_column = ("; from datasize import DataSizeArray"
+           "; column = DataSizeArray(n * 7919 ** (n % 4) for n in range(10000))"
+           "; sizes = list(column)")
+_log_file = ("; import os, tempfile; from datasize.scanner import scan, scan_file, scan_file_into"
+             "; path = os.path.join(tempfile.gettempdir(), 'datasize-bench.log')"
+             "; open(path, 'w').write(''.join("
+             "'{} copied {}MiB of 2GiB in 3s to /var/tmp\\n'.format(n, n % 50) for n in range(10000)))")
+_junk_rows = ("; junk = ['{}MiB'.format(n) if n % 20 else 'n/a {}'.format(n)"
+              " for n in range(10000)]")
+_links = ("; from datasize import DataRate"
+          "; links = ['{}Gbps'.format(1 + n % 10) for n in range(10000)]")
+_du = ("; import random; random.seed(1)"
+       "; du = ['{}{}\\t./dir{}'.format(random.randint(1, 1023), random.choice('KMG'), n)"
+       " for n in range(100000)]")
+_rows = "; rows = ['{}MiB'.format(n % 50) for n in range(10000)]"
+
+benchmarks = [
+    # (description, statement, setup[, rows per statement])
+    ("parse '14GiB'", "DataSize('14GiB')", _setup),
+    ("parse '512MiB'", "DataSize('512MiB')", _setup),
+    ("parse '1.5TB'", "DataSize('1.5TB')", _setup),
+    ("parse '25Mb' (bits)", "DataSize('25Mb')", _setup),
+    ("parse '2g' (nonstandard)", "DataSize('2g')", _setup),
+    ("parse '4096' (no unit)", "DataSize('4096')", _setup),
+    ("parse b'14GiB'", "DataSize(b'14GiB')", _setup),
+    ("kubernetes('128Mi') (fast path)", "kubernetes('128Mi')",
+        "from datasize.dialects import kubernetes"),
+    ("kubernetes('1500m') (grammar)", "kubernetes('1500m')",
+        "from datasize.dialects import kubernetes"),
+    ("systemd('1G 512M') (grammar)", "systemd('1G 512M')",
+        "from datasize.dialects import systemd"),
+    ("10k cells, kubernetes.parse_many(output='array')", "kubernetes.parse_many(quantities, output='array')",
+        "from datasize.dialects import kubernetes"
+        "; quantities = ['{}Mi'.format(n % 50) for n in range(10000)]", 10000),
+    ("parse '8sector' (dialect class)", "disk('8sector')",
+        _setup + "; disk = DataSize.dialects.register('disk', units={'sector': 512}, replace=True)"),
+    ("parse '8sector' (dialect=, 20 registered)", "DataSize('8sector', dialect='disk')",
+        _setup + "; [DataSize.dialects.register(str(n), replace=True) for n in range(19)]"
+        "; DataSize.dialects.register('disk', units={'sector': 512}, replace=True)"),
+    ("parse memoryview slice", "DataSize(field[5:10])",
+        _setup + "; field = memoryview(b'size=14GiB;' * 1000)"),
+    ("parse memoryview slice, bytes(...).decode()", "DataSize(bytes(field[5:10]).decode('ascii'))",
+        _setup + "; field = memoryview(b'size=14GiB;' * 1000)"),
+    ("construct from int", "DataSize(4096)", _setup),
+    ("construct from float", "DataSize(600000000000.0)", _setup),
+    ("DataSize.from_bytes(4096)", "DataSize.from_bytes(4096)", _setup),
+    # bulk parsing, per row: 10k rows drawn from 50 distinct specs
+    ("10k rows, DataSize() per row", "[DataSize(s) for s in rows]",
+        _setup + _rows, 10000),
+    ("10k rows, parse_many()", "DataSize.parse_many(rows)", _setup + _rows, 10000),
+    ("10k rows, parse_many(output='array')",
+        "DataSize.parse_many(rows, output='array')", _setup + _rows, 10000),
+    # 5% junk rows: exception handling against error records
+    ("10k rows, 5% junk, try: DataSize() per row", "for s in junk:\n"
+        "    try: DataSize(s)\n    except ValueError: pass", _setup + _junk_rows, 10000),
+    ("10k rows, 5% junk, try_parse() per row", "for s in junk: DataSize.try_parse(s)",
+        _setup + _junk_rows, 10000),
+    ("10k rows, 5% junk, parse_many(errors='collect')",
+        "DataSize.parse_many(junk, errors='collect')", _setup + _junk_rows, 10000),
+    ("10k rows, datasize.numpy.parse_array()", "parse_array(column)",
+        _setup + _rows + '; import numpy; column = numpy.array(rows); '
+        'from datasize.numpy import parse_array', 10000),
+    # text scanning, per line of a synthetic transfer log
+    ("10k log lines, datasize.scan()", "for _ in scan(log): pass",
+        _setup + "; from datasize import scan; log = ['{} copied {}MiB of 2GiB in 3s to "
+        "/var/tmp'.format(n, n % 50) for n in range(10000)]", 10000),
+    ("10k log lines, datasize.scanner.scan_file()", "for _ in scan_file(path): pass",
+        _setup + _log_file, 10000),
+    ("10k log lines, scan(open(path))", "for _ in scan(open(path)): pass",
+        _setup + _log_file, 10000),
+    ("10k log lines, scan_file_into(array('Q'))", "scan_file_into(path, counts)",
+        _setup + _log_file + "; from array import array; counts = array('Q', bytes(8 * 20000))",
+        10000),
+    # column arithmetic, per cell
+    ("10k cells, sum() of a list of DataSize", "sum(sizes)", _setup + _column, 10000),
+    ("10k cells, DataSizeArray.sum()", "column.sum()", _setup + _column, 10000),
+    ("10k cells, DataSizeArray + '1KiB'", "column + '1KiB'", _setup + _column, 10000),
+    ("10k cells, DataSizeArray > '1GiB'", "column > '1GiB'", _setup + _column, 10000),
+    # arithmetic: plain int results re-wrapped, against typed results
+    ("a + b, re-wrapped in DataSize()", "DataSize(a + b)",
+        _setup + "; a, b = DataSize('1GiB'), DataSize('512MiB')"),
+    ("a + b (typed arithmetic)", "a + b",
+        _setup + "; a, b = DataSize('1GiB'), DataSize('512MiB'); DataSize.arithmetic.enable()"),
+    ("a * 3, re-wrapped in DataSize()", "DataSize(a * 3)",
+        _setup + "; a = DataSize('1GiB')"),
+    ("a * 3 (typed arithmetic)", "a * 3",
+        _setup + "; a = DataSize('1GiB'); DataSize.arithmetic.enable()"),
+    ("10k cells, DataSize(sum(sizes))", "DataSize(sum(sizes))", _setup + _column, 10000),
+    ("10k cells, sum(sizes) (typed)", "sum(sizes)",
+        _setup + _column + '; DataSize.arithmetic.enable()', 10000),
+    ("10k cells, DataSize.sum(sizes) (typed)", "DataSize.sum(sizes)",
+        _setup + _column + '; DataSize.arithmetic.enable()', 10000),
+    # sort -h: a key parsed per item, against parsing once per distinct spec
+    ("100k du lines, sorted(key=DataSize(first field))",
+        "sorted(du, key=lambda line: DataSize(line.split(None, 1)[0]))", _setup + _du, 100000),
+    ("100k du lines, sort_human()", "list(sort_human(du))",
+        _setup + _du + "; from datasize import sort_human", 100000),
+    ("100k du lines, sort_human(run_size=10000) (spilled)", "list(sort_human(du, run_size=10000))",
+        _setup + _du + "; from datasize import sort_human", 100000),
+    # expressions: compiled once and cached, against compiling every time
+    ("expr.evaluate('(total - 512MiB) * 0.8')", "evaluate(source, total=total)",
+        _setup + "; from datasize.expr import evaluate; total = DataSize('4GiB')"
+        "; source = '(total - 512MiB) * 0.8'"),
+    ("Expression('(total - 512MiB) * 0.8'), uncached", "Expression(source)(total=total)",
+        _setup + "; from datasize.expr import Expression; total = DataSize('4GiB')"
+        "; source = '(total - 512MiB) * 0.8'"),
+    ("expr.evaluate('2GiB + 512MiB') (folded)", "evaluate('2GiB + 512MiB')",
+        _setup + "; from datasize.expr import evaluate"),
+    # rates: per job division, against the batch transfer time column
+    ("parse '1Gbps' (DataRate)", "DataRate('1Gbps')", _setup + "; from datasize import DataRate"),
+    ("10k jobs, [size / DataRate(spec)]", "[size / DataRate(spec) for size, spec in zip(sizes, links)]",
+        _setup + _column + _links, 10000),
+    ("10k jobs, transfer_times(column, links)", "transfer_times(column, links)",
+        _setup + _column + _links + "; from datasize.rate import transfer_times", 10000),
+    # formatting
+    ("'{:.2GiB}'.format(size)", "'{:.2GiB}'.format(size)",
+        _setup + "; size = DataSize('750GB')"),
+    ("'{}'.format(size) (autoformat)", "'{}'.format(size)",
+        _setup + "; size = DataSize('750GB')"),
+    ("DataSize.formatter('.2GiB')(size)", "gib(size)",
+        _setup + "; size = DataSize('750GB'); gib = DataSize.formatter('.2GiB')"),
+    ("'{:.2GiB}' of 750GB (float)", "f(size)",
+        _setup + "; size = DataSize('750GB'); f = DataSize.formatter('.2GiB')"),
+    ("'{:.2GiB}' of 750GB (exact)", "f(size)",
+        _setup + "; size = DataSize('750GB'); f = DataSize.formatter('.2GiB', exact=True)"),
+    ("'{}' of 1536 (float)", "f(size)",
+        _setup + "; size = DataSize(1536); f = DataSize.formatter('')"),
+    ("'{}' of 1536 (exact)", "f(size)",
+        _setup + "; size = DataSize(1536); f = DataSize.formatter('', exact=True)"),
+    ("'{}' of 64GiB (float)", "f(size)",
+        _setup + "; size = DataSize('64GiB'); f = DataSize.formatter('')"),
+    ("'{}' of 64GiB (exact)", "f(size)",
+        _setup + "; size = DataSize('64GiB'); f = DataSize.formatter('', exact=True)"),
+    # bulk formatting, per cell
+    ("10k cells, '{:.2a}'.format() per cell", "[format(s, '.2a') for s in sizes]",
+        _setup + _sizes, 10000),
+    ("10k cells, DataSizeArray.format()", "column.format('.2a')", _setup + _column, 10000),
+    ("10k cells, datasize.numpy.format_array()", "format_array(column, '.2a')",
+        _setup + _sizes + '; import numpy; column = numpy.array(sizes); '
+        'from datasize.numpy import format_array', 10000),
+    ("parse '14GiB' (exact)", "DataSize('14GiB', exact=True)", _setup),
+    ("parse '1.5TB' (exact)", "DataSize('1.5TB', exact=True)", _setup),
+    ("parse '1.5e3MB' (exact)", "DataSize('1.5e3MB', exact=True)", _setup),
+    # the numeric step of a parse in isolation: float vs. integer arithmetic
+    ("mantissa '14' * GiB (float)", "ceil(float(n) * m)",
+        "from math import ceil; n, m = '14', 1024**3"),
+    ("mantissa '14' * GiB (int)", "n.isdigit() and int(n) * m",
+        "n, m = '14', 1024**3"),
+    ("mantissa '1.5' * TB (float)", "ceil(float(n) * m)",
+        "from math import ceil; n, m = '1.5', 1000**4"),
+    ("mantissa '1.5' * TB (exact)", "_ceil_exact(n, m)",
+        "from datasize.__datasize__ import _ceil_exact; n, m = '1.5', 1000**4"),
+    ("parse '512MiB' (parse cache hit)", "DataSize('512MiB')",
+        _setup + '; DataSize.parse_cache.enable(1024)'),
+    ("parse '512MiB' (interned)", "DataSize('512MiB')",
+        _setup + '; DataSize.interning.enable()'),
+    ("construct from int (interned)", "DataSize(4096)",
+        _setup + '; DataSize.interning.enable()'),
+]
+
+
+def per_call(stmt, setup=_setup, number=20000, repeat=5):
+    '''best observed cost of one execution of stmt, in nanoseconds'''
+    best = min(timeit.repeat(stmt, setup=setup, number=number, repeat=repeat))
+    return best / number * 1e9
+
+
+def memory(count=1000000):
+    '''bytes allocated per element when building a column of count round
+    sizes (4KiB to 1MiB): a list of plain ints, a list of DataSize, a list
+    of DataSize with DataSize.interning enabled, and a DataSizeArray'''
+    if tracemalloc is None:
+        raise ImportError('tracemalloc needs Python 3')
+    from datasize import DataSizeArray
+    columns = (
+        ('int', lambda counts: [int(n) for n in counts], False),
+        ('DataSize', lambda counts: [DataSize(n) for n in counts], False),
+        ('DataSize (interned)', lambda counts: [DataSize(n) for n in counts], True),
+        ('DataSizeArray', DataSizeArray, False),
+    )
+    results = []
+    for name, build, interning in columns:
+        counts = ((n % 256 + 1) * 4096 for n in range(count))
+        if interning:
+            DataSize.interning.enable()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        column = build(counts)
+        used = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        DataSize.interning.disable()
+        del column
+        results.append((name, used / float(count)))
+    return results
+
+
+def run(selection=None):
+    '''run the benchmarks whose description contains selection (all of them
+    by default), printing one line per benchmark'''
+    for benchmark in benchmarks:
+        description, stmt, setup = benchmark[:3]
+        if selection and selection not in description:
+            continue
+        try:
+            if len(benchmark) > 3:
+                # bulk statements: report the cost per row
+                cost = per_call(stmt, setup, number=20) / benchmark[3]
+            else:
+                cost = per_call(stmt, setup)
+        except ImportError as err:
+            # optional dependencies
+            print('{:<44} skipped: {}'.format(description, err))
+            continue
+        print('{:<44} {:>10.1f} ns/call'.format(description, cost))
+        # benchmarks may switch on optional machinery in their setup
+        DataSize.parse_cache.disable()
+        DataSize.interning.disable()
+        DataSize.arithmetic.disable()
+    if not selection or selection in 'memory':
+        try:
+            for name, cost in memory():
+                print('{:<44} {:>10.1f} bytes/instance'.format(
+                    'memory, 1M x {}'.format(name), cost))
+        except ImportError as err:
+            print('{:<44} skipped: {}'.format('memory', err))
+
+
+if __name__ == '__main__':
+    import sys
+    run(*sys.argv[1:2])
@@ -0,0 +1,368 @@
+'''Parsers for the size syntaxes of Kubernetes, the JVM, systemd, Docker and du.
+
+    >>> from datasize.dialects import kubernetes, jvm, systemd, docker
+    >>> kubernetes('128Mi'), kubernetes('1e3'), kubernetes('1500m')
+    (134217728, 1000, 2)
+    >>> jvm('-Xmx2g'), systemd('MemoryMax=4G'), docker('--memory=512m')
+    (2147483648, 4294967296, 536870912)
+    >>> kubernetes.format(2**30)
+    '1Gi'
+
+Each follows the rules of its tool exactly, rather than the lenient
+DataSize() syntax: Kubernetes 'M' is 10**6 and 'm' is a thousandth, a
+JVM size is a whole number, systemd rejects '1KB', and Docker truncates
+'1.5k' to 1536 bytes like its Go parser does. Each is also registered
+in DataSize.dialects under its name, so that DataSize(spec,
+dialect='kubernetes'), scan() and expr parse the same way. du, the
+sizes of du -h and sort -h, is a plain dialect of binary K, M, G, ...
+
+DataSize.dialects imports this module the first time a dialect other
+than 'datasize' is registered or looked up, rather than import datasize.
+
+Integer quantities with a suffix take a fast path of one table lookup;
+other specs go through the tool's grammar. parse_many() converts a
+column of specs, and convert() all the sizes of a manifest: a Kubernetes
+object or Compose file as loaded from YAML or JSON, a systemd unit file
+or a JVM command line.
+'''
+from __future__ import absolute_import
+
+from fractions import Fraction
+import re
+import shlex
+
+from datasize.__datasize__ import DataSize, _str_partition
+
+
+class DialectParser(object):
+    '''the size syntax of one tool, registered in DataSize.dialects as a
+    class whose parser is this one's parse(). Abstract: a subclass sets
+    name and units, and defines _parse(spec), the byte count of a spec by
+    the tool's grammar, for the specs the fast path of parse() does not
+    take.'''
+    name = None
+    # unit -> multiple of every unit the syntax accepts
+    units = {}
+    # (suffix, multiple) that format() may choose
+    suffixes = ()
+    # manifest keys whose values are sizes
+    keys = frozenset()
+
+    def __init__(self):
+        self.size_class = DataSize.dialects.register(
+            self.name, units=self.units, base=None, replace=True, parse=self.parse)
+        # the fast path: integer multiples, by unit
+        self._integer_units = dict((unit, multiple) for unit, multiple in self.units.items()
+                                   if isinstance(multiple, int))
+        self._suffixes = sorted(self.suffixes, key=lambda suffix: -suffix[1])
+
+    def __call__(self, spec):
+        '''DataSize of a spec in this syntax'''
+        return self.size_class(spec)
+
+    def __repr__(self):
+        return 'datasize.dialects.{}'.format(self.name)
+
+    def parse(self, spec, exact=False):
+        '''byte count of a string spec'''
+        raw_size, raw_unit = _str_partition(spec)
+        if raw_size.isdigit():
+            multiple = self._integer_units.get(raw_unit)
+            if multiple is not None:
+                return int(raw_size) * multiple
+        return self._parse(spec)
+
+    def _invalid(self, spec, reason='invalid size'):
+        return ValueError("'{}' {} for {}".format(spec, reason, self.name))
+
+    def parse_many(self, specs, output='list', errors='raise'):
+        '''parse a column of specs, see DataSize.parse_many()'''
+        return self.size_class.parse_many(specs, output=output, errors=errors)
+
+    def format(self, size):
+        '''size spelled in this syntax, with the largest suffix that keeps
+        it a whole number'''
+        count = int(size)
+        for suffix, multiple in self._suffixes:
+            if count and not count % multiple:
+                return '{}{}'.format(count // multiple, suffix)
+        return str(count)
+
+    def convert(self, document):
+        '''copy of a manifest, as loaded from YAML or JSON, with the value
+        of every size key parsed'''
+        return self._convert(document, None)
+
+    def _convert(self, node, key):
+        if isinstance(node, dict):
+            return dict((name, self._convert(value, name)) for name, value in node.items())
+        if isinstance(node, list):
+            return [self._convert(item, None) for item in node]
+        if self._is_size_key(key) and not isinstance(node, bool) and node is not None:
+            return self(node)
+        return node
+
+    def _is_size_key(self, key):
+        return key in self.keys
+
+
+def _binary(suffixes):
+    '''suffix -> 1024**n for the suffixes of K, M, G... in order'''
+    return dict((suffix, 1024**power) for power, suffix in enumerate(suffixes, 1))
+
+
+class Kubernetes(DialectParser):
+    '''resource.Quantity: '128Mi', '1G' (10**9), '1e3', '1500m' (1.5),
+    rounded up away from zero to whole bytes like Quantity.Value()'''
+    name = 'kubernetes'
+    units = _binary(('Ki', 'Mi', 'Gi', 'Ti', 'Pi', 'Ei'))
+    units.update((suffix, 1000**power) for power, suffix in enumerate('kMGTPE', 1))
+    units.update(n=Fraction(1, 10**9), u=Fraction(1, 10**6), m=Fraction(1, 1000))
+    units[''] = 1
+    suffixes = [(suffix, multiple) for suffix, multiple in units.items()
+                if isinstance(multiple, int) and multiple > 1]
+    keys = frozenset(['memory', 'storage', 'ephemeral-storage', 'sizeLimit'])
+
+    _max_exponent = 100
+    _pattern = re.compile(r'([+-]?)([0-9]+(?:\.[0-9]*)?|\.[0-9]+)'
+                          r'(?:[eE]([+-]?[0-9]+)|(Ki|Mi|Gi|Ti|Pi|Ei|[numkMGTPE])?)\Z')
+
+    def _parse(self, spec):
+        match = self._pattern.match(spec)
+        if match is None:
+            raise self._invalid(spec)
+        sign, number, exponent, suffix = match.groups()
+        value = Fraction(number)
+        if exponent is not None:
+            if abs(int(exponent)) > self._max_exponent:
+                raise self._invalid(spec, 'is out of range')
+            value *= Fraction(10)**int(exponent)
+        else:
+            value *= self.units[suffix or '']
+        count = -(-value.numerator // value.denominator)
+        return -count if sign == '-' else count
+
+    def _is_size_key(self, key):
+        # requests and limits of memory, storage and huge pages
+        return key in self.keys or (key or '').startswith('hugepages-')
+
+
+class JVM(DialectParser):
+    '''-Xmx, -Xms, -Xss, -Xmn and -XX: sizes: a whole number, decimal or
+    0x hexadecimal, with at most one of the suffixes k, m, g or t (1024**n,
+    either case), as the JVM's own atojulong() reads them'''
+    name = 'jvm'
+    units = _binary('kmgt')
+    units.update(_binary('KMGT'))
+    units[''] = 1
+    suffixes = _binary('kmgt').items()
+    keys = frozenset(['-Xmx', '-Xms', '-Xss', '-Xmn',
+                      '-XX:MaxHeapSize', '-XX:InitialHeapSize', '-XX:MinHeapSize',
+                      '-XX:SoftMaxHeapSize', '-XX:MaxNewSize', '-XX:NewSize',
+                      '-XX:OldSize', '-XX:MaxMetaspaceSize', '-XX:MetaspaceSize',
+                      '-XX:CompressedClassSpaceSize', '-XX:MaxDirectMemorySize',
+                      '-XX:ReservedCodeCacheSize', '-XX:InitialCodeCacheSize',
+                      '-XX:G1HeapRegionSize', '-XX:MaxRAM'])
+
+    _pattern = re.compile(r'(?:0[xX]([0-9a-fA-F]+)|([0-9]+))([kKmMgGtT]?)\Z')
+
+    def parse(self, spec, exact=False):
+        flag, value = self._split(spec)
+        count = DialectParser.parse(self, value, exact)
+        if count >= 2**64:
+            raise self._invalid(spec, 'is too large')
+        return count
+
+    def _parse(self, spec):
+        match = self._pattern.match(spec)
+        if match is None:
+            raise self._invalid(spec)
+        hexadecimal, decimal, suffix = match.groups()
+        count = int(hexadecimal, 16) if hexadecimal else int(decimal)
+        return count * self.units[suffix]
+
+    @staticmethod
+    def _split(spec):
+        '''(flag, value) of '-Xmx2g' or '-XX:MaxMetaspaceSize=256m'; the flag
+        is None for a bare value'''
+        if spec.startswith('-XX:'):
+            flag, _, value = spec.partition('=')
+            return flag, value
+        if spec[:4] in ('-Xmx', '-Xms', '-Xss', '-Xmn'):
+            return spec[:4], spec[4:]
+        return None, spec
+
+    def convert(self, arguments):
+        '''{flag: size} of the size flags in a command line, given as a list
+        of arguments or a string; the last of a repeated flag wins, as it
+        does in the JVM'''
+        if isinstance(arguments, str):
+            arguments = shlex.split(arguments)
+        sizes = {}
+        for argument in arguments:
+            flag, value = self._split(argument)
+            if flag in self.keys:
+                sizes[flag] = self(value)
+        return sizes
+
+
+class Systemd(DialectParser):
+    '''MemoryMax= and the other memory settings: parse_size() with base
+    1024, where 'infinity' is the largest value, 2**64 - 1, and a size
+    may be a sum of decreasing units like '1G 512M'. Fractions are
+    truncated. Percentages of the physical memory are not supported.'''
+    name = 'systemd'
+    infinity = 2**64 - 1
+    units = _binary('KMGTPE')
+    units[''] = units['B'] = 1
+    suffixes = _binary('KMGTPE').items()
+    keys = frozenset(['MemoryMin', 'MemoryLow', 'MemoryHigh', 'MemoryMax',
+                      'MemorySwapMax', 'MemoryZSwapMax', 'MemoryLimit',
+                      'DefaultMemoryMin', 'DefaultMemoryLow', 'StartupMemoryLow',
+                      'StartupMemoryHigh', 'StartupMemoryMax', 'StartupMemorySwapMax',
+                      'StartupMemoryZSwapMax'])
+
+    # parse_size() table order: a sum must use each unit once, largest first
+    _table = [('E', 1024**6), ('P', 1024**5), ('T', 1024**4), ('G', 1024**3),
+              ('M', 1024**2), ('K', 1024), ('B', 1), ('', 1)]
+    _component = re.compile(r'[ \t\n\r]*\+?([0-9]+)(?:\.([0-9]*))?[ \t\n\r]*')
+
+    def parse(self, spec, exact=False):
+        if '=' in spec:
+            spec = spec.partition('=')[2]
+        if spec == 'infinity':
+            return self.infinity
+        count = DialectParser.parse(self, spec, exact)
+        if count >= 2**64:
+            raise self._invalid(spec, 'is too large')
+        return count
+
+    def _parse(self, spec):
+        if spec.endswith('%'):
+            raise self._invalid(spec, 'is relative to the physical memory')
+        total, start, position, end = 0, 0, 0, len(spec)
+        while True:
+            match = self._component.match(spec, position)
+            if match is None:
+                raise self._invalid(spec)
+            whole, fraction = match.groups()
+            position = match.end()
+            for index in range(start, len(self._table)):
+                suffix, multiple = self._table[index]
+                if spec.startswith(suffix, position):
+                    break
+            count = int(whole) * multiple
+            if fraction:
+                # a double, divided down digit by digit like parse_size()
+                part = float(int(fraction))
+                for _ in fraction:
+                    part /= 10
+                count += int(part * multiple)
+            total += count
+            start, position = index + 1, position + len(suffix)
+            if position >= end:
+                return total
+            if start >= len(self._table):
+                raise self._invalid(spec)
+
+    def format(self, size):
+        if size == self.infinity:
+            return 'infinity'
+        return DialectParser.format(self, size)
+
+    def convert(self, unit):
+        '''{setting: size} of the memory settings in a unit file, given as
+        text or lines. The last assignment wins, and an empty one resets
+        the setting, as in systemd.'''
+        if isinstance(unit, str):
+            unit = unit.splitlines()
+        sizes = {}
+        for line in unit:
+            line = line.strip()
+            if not line or line[0] in '#;[':
+                continue
+            key, _, value = line.partition('=')
+            key, value = key.strip(), value.strip()
+            if key not in self.keys:
+                continue
+            if value:
+                sizes[key] = self(value)
+            else:
+                sizes.pop(key, None)
+        return sizes
+
+
+class Docker(DialectParser):
+    '''--memory, --shm-size and the Compose memory keys: go-units
+    RAMInBytes(), a decimal number, an optional space, and an optional
+    b, k, m, g, t or p (1024**n, either case) with an optional i and b,
+    truncated to whole bytes like Go's int64(float64). -1, Docker's
+    unlimited swap, is accepted too.'''
+    name = 'docker'
+    units = {}
+    for _power, _prefix in enumerate(('', 'k', 'm', 'g', 't', 'p')):
+        for _initial in set([_prefix, _prefix.upper()]):
+            for _i in ('', 'i', 'I'):
+                for _b in ('', 'b', 'B'):
+                    units[_initial + _i + _b] = 1024**_power
+    del _power, _prefix, _initial, _i, _b
+    suffixes = _binary('kmgtp').items()
+    keys = frozenset(['mem_limit', 'mem_reservation', 'memswap_limit', 'shm_size',
+                      'memory', '--memory', '-m', '--memory-reservation',
+                      '--memory-swap', '--kernel-memory', '--shm-size'])
+
+    _pattern = re.compile(r'([0-9]+(?:\.[0-9]+)*) ?([kKmMgGtTpP])?[iI]?[bB]?\Z')
+    _prefixes = dict((prefix, 1024**power) for power, prefix in enumerate('kmgtp', 1))
+
+    def parse(self, spec, exact=False):
+        if spec.startswith('-') and spec != '-1':
+            # '--memory=512m'
+            flag, equals, spec = spec.partition('=')
+            if not equals:
+                raise self._invalid(flag)
+        if spec == '-1':
+            return -1
+        return DialectParser.parse(self, spec, exact)
+
+    def _parse(self, spec):
+        match = self._pattern.match(spec)
+        if match is None:
+            raise self._invalid(spec)
+        number, prefix = match.groups()
+        try:
+            value = float(number)
+        except ValueError:
+            raise self._invalid(spec)
+        if prefix:
+            value *= self._prefixes[prefix.lower()]
+        return int(value)
+
+    def convert(self, document):
+        '''copy of a Compose file, as loaded from YAML or JSON, with its
+        memory sizes parsed; or {flag: size} of the size flags in a
+        docker run command line, given as a list of arguments or a string'''
+        if isinstance(document, dict):
+            return self._convert(document, None)
+        if isinstance(document, str):
+            document = shlex.split(document)
+        sizes = {}
+        arguments = iter(document)
+        for argument in arguments:
+            flag, equals, value = argument.partition('=')
+            if flag not in self.keys or not flag.startswith('-'):
+                continue
+            if not equals:
+                value = next(arguments, '')
+            sizes[flag] = self(value)
+        return sizes
+
+
+kubernetes = Kubernetes()
+jvm = JVM()
+systemd = Systemd()
+docker = Docker()
+
+# the sizes of du -h: K, M, G, ... are binary, and the rest as DataSize()
+du = DataSize.dialects.register(
+    'du', prefixes=dict((prefix, 1024 ** power) for power, prefix in enumerate('KMGTPEZY', 1)),
+    replace=True)
@@ -0,0 +1,238 @@
+'''Safe arithmetic on data sizes, for configuration values.
+
+    >>> from datasize import expr
+    >>> expr.evaluate('2GiB + 512MiB')
+    2684354560
+    >>> heap = expr.compile('(total - 512MiB) * 0.8')
+    >>> heap(total='4GiB'), heap(total='8GiB')
+    (3006477108, 6442450944)
+
+Expressions combine DataSize literals ('2GiB'), plain numbers, named
+references and + - * / with parentheses. They are parsed by a small
+recursive descent parser, never by eval(), into a tree of closures. The
+compiled expression is cached by its source text, so evaluating the
+same text again with other bindings skips tokenizing and parsing, and
+constant subexpressions are folded once at compile time.
+
+Non-integer numbers are kept as exact fractions, and the result is a
+DataSize rounded up to a whole byte, like DataSize(0.5) is 1 byte.
+'''
+from __future__ import absolute_import
+
+from decimal import Decimal
+from fractions import Fraction
+from math import ceil
+from numbers import Real
+import operator
+import re
+
+from datasize.__datasize__ import DataSize, ParseCache, _integer_types
+from datasize.scanner import _trie_regex
+
+# compiled expressions by source text, an LRU like DataSize.parse_cache
+expression_cache = ParseCache(1024)
+# compiled token patterns, by unit table
+_patterns = {}
+# bound values used as they are
+_plain_types = (DataSize, int, float, Fraction)
+
+
+def _token_pattern(cls):
+    '''regular expression for one token of an expression over the units of
+    cls'''
+    table = cls._unit_table
+    compiled = _patterns.get(id(table))
+    if compiled is None or compiled[0] is not table:
+        number = r'(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?'
+        pattern = re.compile(
+            r'\s*(?:(?P<size>{number}{units})(?![A-Za-z0-9_])|(?P<number>{number})'
+            r'|(?P<name>[A-Za-z_][A-Za-z0-9_.]*)|(?P<op>[-+*/()]))'.format(
+                number=number, units=_trie_regex(unit for unit in table if unit)))
+        compiled = _patterns[id(table)] = (table, pattern)
+    return compiled[1]
+
+
+class Expression(object):
+    '''a compiled size expression; call it with the values of its names,
+    given as a mapping and/or keywords, to get a DataSize'''
+    __slots__ = ('source', 'names', '_evaluate')
+
+    def __init__(self, source, cls=DataSize):
+        self.source = source
+        parser = _Parser(source, cls)
+        self._evaluate = parser.parse()
+        self.names = frozenset(parser.names)
+
+    def __call__(self, variables=None, **bindings):
+        if variables:
+            bindings.update(variables)
+        values = {}
+        for name in self.names:
+            try:
+                value = bindings[name]
+            except KeyError:
+                raise KeyError("'{}' is not defined in '{}'".format(name, self.source))
+            values[name] = _operand(value)
+        return _size(self._evaluate(values))
+
+    def __repr__(self):
+        return 'Expression({!r})'.format(self.source)
+
+
+def compile(source, cls=DataSize):
+    '''the Expression for source, from the cache when it was compiled before'''
+    key = (source, cls)
+    expression = expression_cache.get(key)
+    if expression is None:
+        expression = Expression(source, cls)
+        expression_cache.put(key, expression)
+    return expression
+
+
+def evaluate(source, variables=None, **bindings):
+    '''DataSize value of the expression source, see Expression'''
+    return compile(source)(variables, **bindings)
+
+
+def _size(value):
+    '''DataSize of a result, rounded up to a whole byte'''
+    if isinstance(value, Fraction):
+        value = -(-value.numerator // value.denominator)
+    elif not isinstance(value, _integer_types):
+        value = ceil(value)
+    return DataSize.interning.new(DataSize, value)
+
+
+def _operand(value):
+    '''a bound value as a number: specs are parsed, numbers kept'''
+    if type(value) in _plain_types:
+        return value
+    if isinstance(value, Decimal):
+        return Fraction(value)
+    if isinstance(value, Real) or hasattr(value, '__index__'):
+        return value
+    return DataSize(value)
+
+
+def _divide(dividend, divisor, source):
+    '''dividend / divisor, exact for integers'''
+    if not divisor:
+        raise ValueError("division by zero in '{}'".format(source))
+    if isinstance(dividend, _integer_types) and isinstance(divisor, _integer_types):
+        quotient = Fraction(dividend, divisor)
+        return quotient.numerator if quotient.denominator == 1 else quotient
+    return dividend / divisor
+
+
+_operators = {'+': operator.add, '-': operator.sub, '*': operator.mul}
+
+
+class _Parser(object):
+    '''recursive descent parser compiling tokens to closures. Each parse
+    method returns (evaluate, constant), where constant is True when
+    evaluate ignores the bindings, so that it can be folded.
+
+        expression := term (('+' | '-') term)*
+        term       := factor (('*' | '/') factor)*
+        factor     := ('+' | '-') factor | size | number | name | '(' expression ')'
+    '''
+    def __init__(self, source, cls):
+        self.source = source
+        self.cls = cls
+        self.names = set()
+        self.tokens = self._tokenize(_token_pattern(cls))
+        self.position = 0
+
+    def _tokenize(self, pattern):
+        tokens = []
+        position, end = 0, len(self.source.rstrip())
+        while position < end:
+            match = pattern.match(self.source, position)
+            if match is None:
+                self._fail(position, 'unexpected character')
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind), match.start(kind)))
+            position = match.end()
+        tokens.append(('end', '', end))
+        return tokens
+
+    def _fail(self, position, reason):
+        raise ValueError("invalid expression '{}' at {}: {}".format(self.source, position, reason))
+
+    def _next(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _peek(self):
+        return self.tokens[self.position]
+
+    def parse(self):
+        evaluate, constant = self._expression()
+        kind, text, position = self._next()
+        if kind != 'end':
+            self._fail(position, "unexpected '{}'".format(text))
+        return evaluate
+
+    def _binary(self, operand, symbols):
+        left, left_constant = operand()
+        while self._peek()[0] == 'op' and self._peek()[1] in symbols:
+            symbol = self._next()[1]
+            if symbol == '/':
+                source = self.source
+                function = lambda dividend, divisor: _divide(dividend, divisor, source)
+            else:
+                function = _operators[symbol]
+            right, right_constant = operand()
+            left = _apply(function, left, right, left_constant and right_constant)
+            left_constant = left_constant and right_constant
+        return left, left_constant
+
+    def _expression(self):
+        return self._binary(self._term, '+-')
+
+    def _term(self):
+        return self._binary(self._factor, '*/')
+
+    def _factor(self):
+        kind, text, position = self._next()
+        if kind == 'op' and text in '+-':
+            operand, constant = self._factor()
+            if text == '+':
+                return operand, constant
+            return _apply(operator.neg, operand, None, constant), constant
+        if kind == 'size':
+            try:
+                value = self.cls(text)
+            except (ValueError, ArithmeticError) as err:
+                self._fail(position, err)
+            return (lambda values: value), True
+        if kind == 'number':
+            value = Fraction(text)
+            if value.denominator == 1:
+                value = value.numerator
+            return (lambda values: value), True
+        if kind == 'name':
+            self.names.add(text)
+            return (lambda values: values[text]), False
+        if kind == 'op' and text == '(':
+            inner = self._expression()
+            kind, text, position = self._next()
+            if (kind, text) != ('op', ')'):
+                self._fail(position, "expected ')'")
+            return inner
+        self._fail(position, 'expected a size, number, name or (' if kind != 'end'
+                   else 'unexpected end')
+
+
+def _apply(function, left, right, constant):
+    '''closure applying function to the results of left and right (or left
+    alone when right is None), folded to a constant when possible'''
+    if right is None:
+        closure = lambda values: function(left(values))
+    else:
+        closure = lambda values: function(left(values), right(values))
+    if constant:
+        value = closure(None)
+        return lambda values: value
+    return closure
@@ -0,0 +1,281 @@
+'''NumPy vectorized bulk parsing and formatting of data sizes. Requires numpy.
+
+    >>> import numpy as np
+    >>> from datasize.numpy import parse_array
+    >>> parse_array(np.array(['14GiB', '512MiB', '1.5kB', '25Mb']))
+    array([15032385536,   536870912,        1500,     3125000], dtype=uint64)
+
+Strings of the regular form <digits>[.<digits>]<unit> are split and
+resolved in vectorized form over the raw character buffer of a 'U' or 'S'
+array, using the same unit table as DataSize. Anything else (whitespace,
+signs, exponents, unusual suffixes) is handed to the DataSize parser one
+row at a time, so results always match DataSize(spec).
+
+    >>> from datasize.numpy import format_array
+    >>> format_array(np.array([1536, 10**9, 512]), '.2a')
+    array(['1.50KiB', '1GB', '512B'], dtype='<U7')
+
+format_array() is the inverse, and matches DataSize.__format__() exactly.
+'''
+from __future__ import absolute_import
+
+import numpy as np
+
+from datasize.__datasize__ import DataSize
+
+# rows handled per vectorized pass, to bound temporary memory
+_chunk_rows = 1 << 16
+_uint64_limit = 2**64
+# longest unit abbreviation handled in vectorized form ('KiB')
+_max_unit_length = 3
+_zero, _period, _nul = ord('0'), ord('.'), 0
+# exact float powers of ten for decimal mantissas of up to 22 places
+_float_powers_of_ten = np.array([float(10**n) for n in range(23)])
+
+
+def _pack(unit):
+    '''integer key for a unit abbreviation of up to three ASCII characters'''
+    key = 0
+    for position, char in enumerate(unit):
+        key |= ord(char) << (8 * position)
+    return key
+
+
+class _UnitLookup(object):
+    '''DataSize unit table compiled to sorted arrays for searchsorted()'''
+    def __init__(self, unit_table):
+        units = sorted((_pack(unit), unit) for unit in unit_table
+                       if len(unit) <= _max_unit_length)
+        self.keys = np.array([key for key, _ in units], dtype=np.uint64)
+        multiples = [unit_table[unit][0] for _, unit in units]
+        self.is_bits = np.array([unit_table[unit][1] for _, unit in units])
+        # multiples beyond 64 bits ('YB', 'ZiB', ...) only take the scalar path
+        self.wide = np.array([m >= _uint64_limit for m in multiples])
+        self.multiples = np.array([0 if m >= _uint64_limit else m for m in multiples],
+                                  dtype=np.uint64)
+        self.float_multiples = np.array([float(m) for m in multiples])
+        self.limits = np.array([0 if m >= _uint64_limit else (_uint64_limit - 1) // m
+                                for m in multiples], dtype=np.uint64)
+        # rank of every byte value, see _parse_chunk()
+        self.ranks = np.full(256, _OTHER, dtype=np.int8)
+        self.ranks[[ord(c) for unit in unit_table for c in unit]] = _UNIT
+        self.ranks[[ord(c) for c in '0123456789.']] = _NUMBER
+        self.ranks[_nul] = _NUL
+
+    def find(self, keys):
+        '''index into the tables for each key, and whether it was found'''
+        index = np.searchsorted(self.keys, keys)
+        np.minimum(index, len(self.keys) - 1, out=index)
+        return index, self.keys[index] == keys
+
+
+_lookups = {}
+
+def _unit_lookup(cls):
+    '''compiled lookup for the unit table of cls, built on first use'''
+    table = cls._unit_table
+    compiled = _lookups.get(id(table))
+    if compiled is None or compiled[0] is not table:
+        compiled = _lookups[id(table)] = (table, _UnitLookup(table))
+    return compiled[1]
+
+
+def _char_matrix(values):
+    '''(width, rows) uint8 matrix of the character codes of a 1-d 'U' or
+    'S' array, NUL padded, laid out so that each character position is
+    contiguous across rows. Non ASCII characters become 0xff, which makes
+    their rows irregular.'''
+    if values.dtype.kind == 'U':
+        values = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('='))
+        codes = values.view(np.uint32).reshape(len(values), -1)
+        codes = np.where(codes < 0x80, codes, 0xff).astype(np.uint8)
+    else:
+        values = np.ascontiguousarray(values)
+        codes = values.view(np.uint8).reshape(len(values), -1)
+    return np.ascontiguousarray(codes.T)
+
+
+# character ranks: a regular row never steps down in rank
+_NUMBER, _UNIT, _NUL, _OTHER = 0, 1, 2, 3
+
+def _parse_chunk(chars, lookup, exact, out):
+    '''fill out with the byte counts of the regular rows in the (width,
+    rows) character matrix chars; returns a mask of the rows left for the
+    scalar parser'''
+    width, rows = chars.shape
+    rank = lookup.ranks[chars]
+    is_digit = chars - np.uint8(_zero) < 10
+    is_period = chars == _period
+
+    # regular rows are a run of number characters, a run of unit
+    # characters, then NUL padding
+    regular = (rank[1:] >= rank[:-1]).all(axis=0)
+    regular &= rank[-1] != _OTHER
+    number_length = (rank == _NUMBER).sum(axis=0)
+    unit_length = (rank == _UNIT).sum(axis=0)
+    periods = is_period.sum(axis=0)
+    digits = number_length - periods
+    regular &= (digits > 0) & (digits <= 19) & (periods <= 1)
+    regular &= unit_length <= _max_unit_length
+
+    mantissa = np.zeros(rows, dtype=np.uint64)
+    for column in range(width):
+        take = is_digit[column]
+        mantissa[take] = mantissa[take] * 10 + (chars[column, take] - np.uint8(_zero))
+
+    unit_key = np.zeros(rows, dtype=np.uint64)
+    for offset in range(_max_unit_length):
+        position = np.minimum(number_length + offset, width - 1)
+        char = np.take_along_axis(chars, position[None, :], axis=0)[0].astype(np.uint64)
+        present = offset < unit_length
+        unit_key |= np.where(present, char, 0) << np.uint64(8 * offset)
+    unit, found = lookup.find(unit_key)
+    regular &= found & ~lookup.wide[unit]
+
+    is_bits = lookup.is_bits[unit]
+    whole = regular & (periods == 0)
+    whole &= mantissa <= lookup.limits[unit]
+    value = mantissa * lookup.multiples[unit]
+    value = np.where(is_bits, value // 8 + (value % 8 != 0), value)
+    out[whole] = value[whole]
+
+    if exact:
+        return ~whole
+
+    # decimal mantissas follow the float arithmetic of DataSize._parse()
+    fraction = regular & (periods == 1) & (mantissa < 2**53)
+    places = number_length - 1 - np.argmax(is_period, axis=0)
+    fraction &= places < len(_float_powers_of_ten)
+    places = np.where(fraction, places, 0)
+    with np.errstate(invalid='ignore', over='ignore'):
+        scaled = mantissa.astype(np.float64) / _float_powers_of_ten[places]
+        scaled = scaled * lookup.float_multiples[unit]
+        scaled = np.ceil(np.where(is_bits, scaled / 8, scaled))
+    fraction &= scaled < float(_uint64_limit)
+    out[fraction] = scaled[fraction].astype(np.uint64)
+    return ~(whole | fraction)
+
+
+def parse_array(values, exact=None, cls=DataSize):
+    '''byte counts of an array of size strings, with the shape of values.
+
+    Returns a uint64 array, or an object array of Python ints if any count
+    falls outside the uint64 range. Raises ValueError like DataSize() on
+    the first string that cannot be parsed.
+
+    cls may be the class of a dialect, see DataSize.dialects; one that
+    has a parser of its own, like those of datasize.dialects, parses
+    every string with it, one at a time.
+    '''
+    values = np.asarray(values)
+    if values.dtype.kind not in 'US':
+        values = values.astype('U')
+    if exact is None:
+        exact = cls.exact_parsing
+    shape = values.shape
+    values = values.reshape(-1)
+
+    counts = np.zeros(len(values), dtype=np.uint64)
+    if not values.dtype.itemsize:
+        # only empty strings, which DataSize rejects
+        values = values.astype('U1')
+    if cls._parse.__func__ is not DataSize._parse.__func__:
+        # a dialect with a syntax of its own, which its parser reads
+        leftover = range(len(values))
+    else:
+        lookup = _unit_lookup(cls)
+        leftover = []
+        for start in range(0, len(values), _chunk_rows):
+            chunk = values[start:start + _chunk_rows]
+            scalar = _parse_chunk(_char_matrix(chunk), lookup, exact,
+                                  counts[start:start + _chunk_rows])
+            leftover.extend(start + np.flatnonzero(scalar))
+
+    wide = {}
+    for position in leftover:
+        spec = values[position]
+        if isinstance(spec, bytes):
+            spec = spec.decode('ascii')
+        value = cls._parse(str(spec), exact)
+        if 0 <= value < _uint64_limit:
+            counts[position] = value
+        else:
+            wide[position] = value
+
+    if wide:
+        counts = counts.astype(object)
+        for position, value in wide.items():
+            counts[position] = value
+    return counts.reshape(shape)
+
+
+def format_array(counts, code='', word_length=8, cls=DataSize):
+    '''array of str formatting each byte count in counts with a
+    DataSize.__format__() code, so that the result matches
+    '{:<code>}'.format(DataSize(n)) for every element.
+
+    The autoformat modes choose units for the whole array at once, by
+    searching the sorted denominations of DataSize.formatter(code). Every
+    element that shares a unit, and is integer or not in it, shares one
+    template. With DataSize.exact_formatting, elements are formatted in
+    integer arithmetic one at a time, as the scalar format does.
+    '''
+    counts = np.asarray(counts)
+    shape = counts.shape
+    counts = counts.reshape(-1)
+    if counts.dtype.kind == 'O':
+        sizes = np.array([float(n) for n in counts], dtype=np.float64)
+    elif counts.dtype.kind in 'iub':
+        sizes = counts.astype(np.float64)
+    else:
+        raise TypeError("format_array() needs integer byte counts, not {}".format(counts.dtype))
+
+    compiled = cls.formatter(code)
+    if compiled.exact:
+        return _format_exact(compiled, counts, word_length).reshape(shape)
+
+    # group the elements by the unit the scalar format would choose
+    groups = np.searchsorted(np.array([float(d) for d in compiled.denominations]),
+                             sizes, side='right')
+
+    formatted = np.empty(len(sizes), dtype=object)
+    for group in np.unique(groups):
+        members = np.flatnonzero(groups == group)
+        unit = compiled.unit(group)
+        multiple = word_length if unit.bits else 1
+        if multiple & (multiple - 1):
+            # scaling by a power of two is exact in float, others are not
+            values = np.array([float(int(n) * multiple) for n in counts[members]])
+        else:
+            values = sizes[members] * multiple
+        values /= unit.denomination
+        integer = np.isfinite(values) & (values == np.floor(values))
+
+        for is_integer in (True, False):
+            subset = integer == is_integer
+            if not subset.any():
+                continue
+            template, _ = unit.template(is_integer)
+            render = template.format
+            try:
+                if is_integer:
+                    text = [render(int(v)) for v in values[subset].tolist()]
+                else:
+                    text = [render(v) for v in values[subset].tolist()]
+            except ValueError:
+                raise ValueError("Invalid format specifier: '{}' --> {}".format(code, template))
+            formatted[members[subset]] = text
+
+    return formatted.astype(str).reshape(shape)
+
+
+def _format_exact(compiled, counts, word_length):
+    '''array of str formatting each byte count with the exact Formatter
+    compiled, in integer arithmetic'''
+    formatted = []
+    for count in counts.tolist():
+        count = int(count)
+        unit = compiled.unit(compiled.select(count) if compiled.denominations else 0)
+        multiple = word_length if unit.bits else 1
+        formatted.append(unit.exact_format(count * multiple, compiled.rounding))
+    return np.array(formatted, dtype=str)
@@ -0,0 +1,181 @@
+'''Parallel parsing of size columns in large delimited or line files.
+
+    >>> from datasize.parallel import parse_file
+    >>> sizes = parse_file('inventory.csv', column=2, header=True)  # doctest: +SKIP
+    >>> total = parse_file('inventory.csv', column=2, reduce='sum')  # doctest: +SKIP
+
+The file is split into byte ranges that end on line boundaries, and the
+ranges are parsed in a multiprocessing pool. Each worker reads only its
+own range and sends back a compact array('Q') of byte counts, or just
+its partial sum or histogram, so the parent never holds a Python object
+per row.
+
+Fields are split on the delimiter. Chunks that contain a double quote
+are split by the csv module, which understands quoted fields.
+
+On platforms that spawn rather than fork worker processes, call
+parse_file() from under an `if __name__ == '__main__':` guard.
+'''
+from __future__ import absolute_import
+
+from array import array
+from bisect import bisect_right
+import csv
+import multiprocessing
+import os
+
+from datasize.__datasize__ import DataSize, ParseFailure
+from datasize.sizearray import DataSizeArray
+
+# target bytes per chunk; there are at least four chunks per worker
+_chunk_bytes = 32 << 20
+# files smaller than this are parsed in the calling process
+_min_parallel_bytes = 4 << 20
+# default histogram bins: the IEC units, 1KiB up to 1YiB
+_unit_bins = [1024**n for n in range(1, 9)]
+
+
+def parse_file(path, column=None, delimiter=None, header=False, workers=None,
+               reduce=None, bins=None, errors='raise', exact=None):
+    '''parse a size from every line of the file at path.
+
+    column:    index of the field holding the size in delimited rows, or
+               None when each whole line is a size
+    delimiter: field separator; '\\t' for .tsv files and ',' otherwise
+    header:    skip the first line
+    workers:   process count, all CPUs by default
+    reduce:    None       DataSizeArray of the sizes, in file order
+               'sum'      DataSize total of the sizes
+               'histogram' list of counts of the sizes in each bin: sizes
+                          below bins[0], then in [bins[i - 1], bins[i]),
+                          then at or above bins[-1]
+    bins:      sorted histogram bin edges, as counts or specs; the IEC
+               units from 1KiB to 1YiB by default
+    errors:    'raise', 'skip' or 'collect', as in DataSize.parse_many();
+               'collect' returns (result, failures), where the failure
+               index is the line number in the file, counting from 0
+    '''
+    if reduce not in (None, 'sum', 'histogram'):
+        raise ValueError("reduce must be None, 'sum' or 'histogram': '{}'".format(reduce))
+    if errors not in ('raise', 'skip', 'collect'):
+        raise ValueError("errors must be 'raise', 'skip' or 'collect': '{}'".format(errors))
+    if delimiter is None:
+        delimiter = '\t' if path.endswith('.tsv') else ','
+    if exact is None:
+        exact = DataSize.exact_parsing
+    if reduce == 'histogram':
+        bins = _unit_bins if bins is None else sorted(int(DataSize(edge)) for edge in bins)
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    size = os.path.getsize(path)
+    if workers < 2 or size < _min_parallel_bytes:
+        chunks = 1
+    else:
+        chunks = max(workers * 4, size // _chunk_bytes)
+    bounds = _line_bounds(path, size, chunks)
+    tasks = [(path, start, end, column, delimiter, header and not start, exact,
+              errors, reduce, bins) for start, end in zip(bounds, bounds[1:])]
+
+    if len(tasks) < 2:
+        results = map(_parse_range, tasks)
+        return _combine(results, reduce, bins, errors)
+    pool = multiprocessing.Pool(min(workers, len(tasks)))
+    try:
+        # imap keeps file order, and hands results over as they arrive
+        return _combine(pool.imap(_parse_range, tasks), reduce, bins, errors)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _line_bounds(path, size, chunks):
+    '''chunk boundary offsets from 0 to size, each at the start of a line'''
+    bounds = [0]
+    with open(path, 'rb') as stream:
+        for chunk in range(1, chunks):
+            offset = max(size * chunk // chunks, bounds[-1])
+            stream.seek(offset)
+            # finish the line that the offset falls in
+            stream.readline()
+            offset = stream.tell()
+            if offset >= size:
+                break
+            if offset > bounds[-1]:
+                bounds.append(offset)
+    bounds.append(size)
+    return bounds
+
+
+def _parse_range(task):
+    '''(result, failures, line count) for one byte range of the file, in a
+    worker process'''
+    path, start, end, column, delimiter, skip_header, exact, errors, reduce, bins = task
+    with open(path, 'rb') as stream:
+        stream.seek(start)
+        # sizes are ASCII; latin-1 decodes any other field without failing
+        text = stream.read(end - start).decode('latin-1')
+    lines = text.split('\n')
+    if lines and not lines[-1]:
+        lines.pop()
+    line_count = len(lines)
+    first = 1 if skip_header else 0
+
+    if column is None:
+        specs = lines[first:]
+    else:
+        if '"' in text:
+            rows = csv.reader((line.rstrip('\r') for line in lines[first:]),
+                              delimiter=delimiter)
+        else:
+            rows = (line.split(delimiter) for line in lines[first:])
+        specs = [row[column] if -len(row) <= column < len(row) else None for row in rows]
+
+    if errors == 'collect':
+        counts, failures = DataSize.parse_many(specs, output='array', errors='collect',
+                                               exact=exact)
+        failures = [(failure.index + first,) + failure[1:] for failure in failures]
+    else:
+        counts = DataSize.parse_many(specs, output='array', errors=errors, exact=exact)
+        failures = []
+
+    if reduce == 'sum':
+        result = sum(counts)
+    elif reduce == 'histogram':
+        result = [0] * (len(bins) + 1)
+        for count in counts:
+            result[bisect_right(bins, count)] += 1
+    else:
+        result = counts
+    return result, failures, line_count
+
+
+def _combine(results, reduce, bins, errors):
+    '''reduce the per chunk results, in file order, in the parent'''
+    if reduce == 'sum':
+        combined = 0
+    elif reduce == 'histogram':
+        combined = [0] * (len(bins) + 1)
+    else:
+        combined = array('Q')
+    failures = []
+    line_offset = 0
+    for result, chunk_failures, line_count in results:
+        if reduce == 'sum':
+            combined += result
+        elif reduce == 'histogram':
+            combined = [total + count for total, count in zip(combined, result)]
+        else:
+            combined.extend(result)
+        failures.extend(ParseFailure(index + line_offset, *details)
+                        for index, details in ((failure[0], failure[1:])
+                                               for failure in chunk_failures))
+        line_offset += line_count
+
+    if reduce == 'sum':
+        combined = DataSize.interning.new(DataSize, combined)
+    elif reduce is None:
+        combined = DataSizeArray._wrap(combined)
+    if errors == 'collect':
+        return combined, failures
+    return combined
@@ -0,0 +1,274 @@
+'''DataRate, a throughput in bytes per second.
+
+    >>> from datasize import DataRate, DataSize
+    >>> link = DataRate('1Gbps')
+    >>> link
+    125000000.0
+    >>> from datetime import timedelta
+    >>> link * timedelta(minutes=1)
+    7500000000
+    >>> link * 0.8
+    100000000.0
+    >>> DataSize('30GB') / link
+    240.0
+    >>> '{:.1MiB/min}'.format(DataRate('512MiB/h'))
+    '8.5MiB/min'
+
+A spec is a DataSize spec per a time unit: '100MB/s', '25Mib/s',
+'2GiB/h', '1MB/ms', '4GB/hours', or with the 'ps' (per second) suffix,
+'1Gbps'. A bare unit like 'MB/s' is one of it. Unit words 'bit' and
+'byte' are accepted too, as in '10Gbit/s'. Multiplying a rate
+by a timedelta gives the DataSize transferred, rounded up to a whole
+byte, while multiplying or dividing it by a number scales the rate, as
+in link * 0.8; dividing a DataSize by a rate gives seconds.
+
+transfer_times() and transfer_sizes() do the same for whole columns of
+sizes, rates and durations, parsing each distinct spec only once.
+'''
+from __future__ import absolute_import, division
+
+from array import array
+from datetime import timedelta
+from fractions import Fraction
+from math import ceil
+from numbers import Real
+
+from datasize.__datasize__ import (DataSize, _buffer_types, _decode_ascii,
+                                   _integer_types, _str_partition)
+from datasize.sizearray import DataSizeArray
+
+# seconds per time unit, after the '/' of a spec or a format code
+time_units = {
+    'ms': Fraction(1, 1000), 'msec': Fraction(1, 1000), 'millisecond': Fraction(1, 1000),
+    's': 1, 'sec': 1, 'second': 1,
+    'm': 60, 'min': 60, 'minute': 60,
+    'h': 3600, 'hr': 3600, 'hour': 3600,
+    'd': 86400, 'day': 86400,
+}
+# plurals, as in '1GB/hours'
+time_units.update([(unit + 's', time_units[unit]) for unit in (
+    'msec', 'millisecond', 'sec', 'second', 'min', 'minute', 'hr', 'hour', 'day')])
+# unit words spelled out in a spec, and the DataSize suffix for each
+_unit_words = (('bits', 'b'), ('bit', 'b'), ('bytes', 'B'), ('byte', 'B'))
+
+
+class DataRate(float):
+    '''bytes per second, parsed from a spec like '100MB/s' or '1Gbps', or
+    given as a number. Formats with the DataSize.__format__() codes,
+    optionally followed by a time unit: '{:.1GiB/h}', '{:Mbps}'.
+    '''
+    __slots__ = ()
+
+    def __new__(cls, spec=0):
+        spec_type = type(spec)
+        if spec_type is not str and spec_type in _buffer_types:
+            spec = _decode_ascii(spec)
+        if isinstance(spec, str):
+            return float.__new__(cls, cls._parse(str(spec)))
+        if isinstance(spec, DataSize):
+            # a size per second
+            return float.__new__(cls, int(spec))
+        if isinstance(spec, Real):
+            return float.__new__(cls, spec)
+        raise TypeError("DataRate() spec must be a string or a number, not '{}'".format(
+            spec_type.__name__))
+
+    @classmethod
+    def _parse(cls, spec):
+        '''bytes per second of a string spec like "100MB/s"'''
+        text = spec.strip()
+        if '/' in text:
+            text, _, per = text.rpartition('/')
+            per = per.strip().lower()
+            seconds = time_units.get(per)
+            if seconds is None:
+                raise ValueError("'{}' invalid time unit: '{}'".format(spec, per))
+        elif text.endswith('ps'):
+            text, seconds = text[:-2], 1
+        else:
+            raise ValueError("'{}' has no time unit, like '/s' or 'ps'".format(spec))
+
+        text = text.rstrip()
+        for word, suffix in _unit_words:
+            if text.endswith(word):
+                text = text[:-len(word)] + suffix
+                break
+        raw_size, raw_unit = _str_partition(text)
+        unit = DataSize._unit_table.get(raw_unit) or DataSize._find_unit(raw_unit)
+        if unit is None:
+            raise ValueError("'{}' invalid unit: '{}'".format(spec, raw_unit))
+        multiple, is_bits = unit
+        if not raw_size:
+            # a bare unit, 'Gbps', is one of it
+            raw_size = '1'
+        divisor = seconds * 8 if is_bits else seconds
+        if raw_size.isdigit():
+            # exact until the final division
+            return Fraction(int(raw_size) * multiple, divisor)
+        return float(raw_size) * multiple / divisor
+
+    @classmethod
+    def parse_many(cls, specs, output='list'):
+        '''parse an iterable of rate specs in one pass, where each distinct
+        spec is parsed only once.
+
+        output: 'list'  list of DataRate
+                'array' array('d') of bytes per second
+        '''
+        if output not in ('list', 'array'):
+            raise ValueError("output must be 'list' or 'array': '{}'".format(output))
+        results = [] if output == 'list' else array('d')
+        convert = cls if output == 'list' else lambda spec: float(cls(spec))
+        append = results.append
+        memo = {}
+        for spec in specs:
+            try:
+                value = memo[spec]
+            except KeyError:
+                value = memo[spec] = convert(spec)
+            except TypeError:
+                # unhashable, so not memoized
+                value = convert(spec)
+            append(value)
+        return results
+
+    def __format__(self, code):
+        '''formats per second with a DataSize.__format__() code, or per the
+        time unit after a '/' in the code; a code ending in 'ps' formats
+        per second with that suffix:
+
+        >>> '{:.2a}'.format(DataRate('10Gbps'))
+        '1.16GiB/s'
+        >>> '{:Gbps}'.format(DataRate('10Gbps'))
+        '10Gbps'
+        '''
+        seconds = 1
+        if '/' in code:
+            code, _, per = code.rpartition('/')
+            try:
+                seconds = time_units[per]
+            except KeyError:
+                raise ValueError("invalid time unit in format code: '{}'".format(per))
+            suffix = '/' + per
+        elif code.endswith('ps'):
+            code, suffix = code[:-2], 'ps'
+        else:
+            suffix = '/s'
+        return _format(DataSize.formatter(code), float(self) * seconds) + suffix
+
+    # arithmetic with durations and sizes
+
+    def __mul__(self, other):
+        '''DataSize transferred in a timedelta, or the rate scaled by a
+        number'''
+        if isinstance(other, timedelta):
+            return DataSize.interning.new(DataSize, _ceil(float(self) * other.total_seconds()))
+        if isinstance(other, (DataSize, DataRate)) or not isinstance(other, Real):
+            return NotImplemented
+        return DataRate(float(self) * other)
+
+    __rmul__ = __mul__
+
+    def __rtruediv__(self, size):
+        '''seconds to transfer size, a DataSize or byte count'''
+        if isinstance(size, _integer_types):
+            return int(size) / float(self)
+        return NotImplemented
+
+    __rdiv__ = __rtruediv__  # Python 2
+
+    def __truediv__(self, other):
+        if isinstance(other, DataRate):
+            return float(self) / float(other)
+        if isinstance(other, Real):
+            return DataRate(float(self) / other)
+        return NotImplemented
+
+    __div__ = __truediv__  # Python 2
+
+    def __add__(self, other):
+        if isinstance(other, DataRate):
+            return DataRate(float(self) + float(other))
+        return float.__add__(self, other)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, DataRate):
+            return DataRate(float(self) - float(other))
+        return float.__sub__(self, other)
+
+    def __neg__(self):
+        return DataRate(-float(self))
+
+    def __reduce__(self):
+        return (DataRate, (float(self),))
+
+
+def _seconds(duration):
+    '''seconds in a duration, or NotImplemented when it is not one'''
+    if isinstance(duration, timedelta):
+        return duration.total_seconds()
+    if isinstance(duration, (DataSize, DataRate)) or not isinstance(duration, Real):
+        return NotImplemented
+    return duration
+
+
+def _format(formatter, value):
+    '''value, bytes that need not be whole, formatted like formatter(size)
+    formats a whole size'''
+    unit = formatter.unit(formatter.select(int(value)) if formatter.denominations else 0)
+    value = value * (DataSize.word_length if unit.bits else 1) / unit.denomination
+    template, cast = unit.template(value.is_integer())
+    return template.format(cast(value))
+
+
+def _ceil(value):
+    '''value rounded up to a whole number of bytes, ignoring float error
+    below a millionth of a byte, so that 2kB/min for 60s is 2000 bytes'''
+    return int(ceil(round(value, 6)))
+
+
+def _broadcast(values, length, convert):
+    '''list of length converted values, from one value or a sequence'''
+    if isinstance(values, (str, timedelta, Real) + _buffer_types):
+        return [convert(values)] * length
+    values = list(values)
+    if len(values) != length:
+        raise ValueError("operands of length {} and {}".format(length, len(values)))
+    return values
+
+
+def transfer_times(sizes, rates):
+    '''array('d') of the seconds to transfer each of sizes at the rate, or
+    at the matching one of rates. Sizes and rates may be specs or numbers
+    (bytes, bytes per second); a zero rate takes forever, float('inf').
+
+    >>> transfer_times(['30GB', '1TB'], '1Gbps').tolist()
+    [240.0, 8000.0]
+    '''
+    counts = DataSizeArray(sizes).counts
+    rates = DataRate.parse_many(_broadcast(rates, len(counts), DataRate), output='array')
+    infinity = float('inf')
+    return array('d', [count / rate if rate else infinity
+                       for count, rate in zip(counts, rates)])
+
+
+def transfer_sizes(rates, durations):
+    '''DataSizeArray of the bytes transferred at each of rates during the
+    duration, or during the matching one of durations (seconds or
+    timedelta), each rounded up to a whole byte.
+    '''
+    if isinstance(rates, (str, Real) + _buffer_types):
+        durations = list(durations)
+        rates = _broadcast(rates, len(durations), DataRate)
+    rates = DataRate.parse_many(rates, output='array')
+    durations = _broadcast(durations, len(rates), _seconds)
+    counts = array('Q')
+    for rate, duration in zip(rates, durations):
+        seconds = _seconds(duration)
+        if seconds is NotImplemented:
+            raise TypeError("durations must be seconds or timedelta, not '{}'".format(
+                type(duration).__name__))
+        counts.append(_ceil(rate * seconds))
+    return DataSizeArray._wrap(counts)
@@ -0,0 +1,187 @@
+'''Extraction of data size tokens from free text.
+
+    >>> from datasize import scan
+    >>> list(scan(['copied 1.4GiB in 3s', 'java -Xmx2g -jar app.jar']))
+    [(1, (7, 13), 1503238554), (2, (9, 11), 2147483648)]
+
+A token is a decimal number followed directly by one of the units that
+DataSize parses, not followed by another letter or digit. Bare numbers
+are not sizes here, and neither is '1.4 GiB' with a space, just like
+DataSize(). Nonstandard single letter units match too, so '5m' is 5MiB.
+Given the class of a dialect, see DataSize.dialects, the units are that
+dialect's, and tokens that its parser rejects are skipped.
+
+scan_file() and scan_file_into() match the same tokens in the raw bytes
+of a memory mapped file, without decoding it or splitting it into lines.
+'''
+from __future__ import absolute_import
+
+import mmap
+import os
+import re
+
+from datasize.__datasize__ import DataSize
+
+# compiled token patterns, by unit table and str or bytes
+_patterns = {}
+# bound on the distinct tokens remembered by one scan()
+_memo_size = 4096
+
+
+def token_pattern(cls=DataSize, binary=False):
+    '''compiled regular expression matching the size tokens of cls, built
+    from its unit table on first use. binary=True matches bytes.'''
+    table = cls._unit_table
+    compiled = _patterns.get((id(table), binary))
+    if compiled is None or compiled[0] is not table:
+        # a number not preceded by a digit or period; each branch opens
+        # with a plain character, checked behind once matched, so that
+        # the regex engine can skip ahead to candidate characters
+        source = (r'(?:[0-9](?<![0-9.][0-9])[0-9]*(?:\.[0-9]+)?|\.(?<![0-9.]\.)[0-9]+)'
+                  r'(?:[eE][+-]?[0-9]+)?{}(?![A-Za-z0-9_])'.format(
+                      _trie_regex(unit for unit in table if unit)))
+        if binary:
+            source = source.encode('ascii')
+        compiled = _patterns[(id(table), binary)] = (table, re.compile(source))
+    return compiled[1]
+
+
+def _trie_regex(words):
+    '''regular expression source matching exactly the given words, as a
+    trie of nested groups so that matching never retries a shared prefix.
+    Optional tails are greedy, so the longest word wins.'''
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def branch(node):
+        alternatives = [re.escape(char) + branch(node[char]) for char in sorted(node) if char]
+        if not alternatives:
+            return ''
+        if len(alternatives) == 1:
+            source = alternatives[0]
+        elif all(len(alternative) == 1 for alternative in alternatives):
+            source = '[{}]'.format(''.join(alternatives))
+        else:
+            source = '(?:{})'.format('|'.join(alternatives))
+        if '' in node:
+            source = '(?:{})?'.format(source)
+        return source
+
+    return branch(trie)
+
+
+def scan(lines, cls=DataSize, exact=None, start=1):
+    '''generator of (line_no, (begin, end), size) for every data size
+    token in an iterable of lines, numbering lines from start. Only one
+    line is held at a time. A single str is split into lines.
+    '''
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    if exact is None:
+        exact = cls.exact_parsing
+    finditer = token_pattern(cls).finditer
+    parse, new = cls._parse, DataSize.interning.new
+    # sizes of recent tokens; logs repeat the same few sizes a lot
+    memo = {}
+    for line_no, line in enumerate(lines, start):
+        for match in finditer(line):
+            token = match.group()
+            try:
+                size = memo[token]
+            except KeyError:
+                if len(memo) >= _memo_size:
+                    memo.clear()
+                size = memo[token] = _parsed(parse, token, exact)
+                if size is not None:
+                    size = memo[token] = new(cls, size)
+            if size is not None:
+                yield line_no, match.span(), size
+
+
+def _parsed(parse, token, exact):
+    '''byte count of a token, or None when the parser rejects it: the
+    parsers of some dialects are stricter than the token pattern, and a
+    token like '1e400KB' overflows'''
+    try:
+        return parse(token, exact)
+    except (ValueError, ArithmeticError):
+        return None
+
+
+def _mapped(path):
+    '''read-only mmap of the file at path, or None if it is empty'''
+    with open(path, 'rb') as stream:
+        if not os.fstat(stream.fileno()).st_size:
+            return None
+        return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _file_tokens(path, cls, exact, start):
+    '''generator of (offset, end, byte_count) for the tokens of the file
+    at path from byte offset start'''
+    mapped = _mapped(path)
+    if mapped is None:
+        return
+    if exact is None:
+        exact = cls.exact_parsing
+    parse = cls._parse
+    memo = {}
+    try:
+        for match in token_pattern(cls, binary=True).finditer(mapped, start):
+            token = match.group()
+            try:
+                count = memo[token]
+            except KeyError:
+                if len(memo) >= _memo_size:
+                    memo.clear()
+                count = memo[token] = _parsed(parse, token.decode('ascii'), exact)
+            if count is not None:
+                yield match.start(), match.end(), count
+    finally:
+        mapped.close()
+
+
+def scan_file(path, cls=DataSize, exact=None, start=0):
+    '''generator of (offset, byte_count) for every data size token in the
+    file at path, from byte offset start. The file is memory mapped and
+    matched as bytes; byte counts are plain ints.
+    '''
+    for offset, _, count in _file_tokens(path, cls, exact, start):
+        yield offset, count
+
+
+def scan_file_into(path, counts, offsets=None, cls=DataSize, exact=None, start=0):
+    '''fill the preallocated sequence counts (an array('Q'), a NumPy
+    array, ...) with the byte counts of the tokens in the file at path,
+    and offsets with their file offsets if given. Stops when counts is
+    full. Tokens whose byte counts the sequence cannot hold, like '100YB'
+    in an array('Q'), are skipped. Returns (filled, resume), where resume
+    is the offset to pass as start to continue after the last token read.
+    '''
+    capacity = len(counts)
+    if offsets is not None and len(offsets) < capacity:
+        raise ValueError("offsets is shorter than counts: {} < {}".format(
+            len(offsets), capacity))
+    filled, resume = 0, start
+    if not capacity:
+        return filled, resume
+    tokens = _file_tokens(path, cls, exact, start)
+    try:
+        for offset, end, count in tokens:
+            try:
+                counts[filled] = count
+            except OverflowError:
+                resume = end
+                continue
+            if offsets is not None:
+                offsets[filled] = offset
+            filled, resume = filled + 1, end
+            if filled == capacity:
+                break
+    finally:
+        tokens.close()
+    return filled, resume
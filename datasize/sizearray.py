@@ -0,0 +1,272 @@
+'''DataSizeArray, a compact column of byte counts.
+
+    >>> from datasize import DataSizeArray
+    >>> sizes = DataSizeArray(['14GiB', '512MiB', 4096])
+    >>> sizes.sum()
+    15569260544
+    >>> sizes[sizes > '1GiB'].format('.1a')
+    ['14GiB']
+
+Counts live in one contiguous array('Q') buffer of 8 bytes per element,
+instead of one DataSize object per element. Elements come back out as
+DataSize, and operands may be DataSize, numbers of bytes, spec strings,
+or other arrays of the same length. A number of bytes that is not whole,
+like the 0.5 of sizes * 0.5, is applied exactly and the results rounded to
+whole bytes: down for // and %, and up otherwise, as DataSize() does.
+'''
+from __future__ import absolute_import, division
+
+from array import array
+from fractions import Fraction
+from itertools import compress
+from numbers import Real
+import operator
+
+from datasize.__datasize__ import (DataSize, __DataSize_super__, _buffer_types,
+                                   _integer_types)
+
+# longest repr before the elements are elided
+_repr_items = 6
+# operations whose results are rounded down to whole bytes
+_rounded_down = (operator.floordiv, operator.mod)
+
+
+class DataSizeArray(object):
+    '''Sequence of byte counts backed by an array('Q') buffer.
+
+    values may be an iterable of anything DataSize() accepts, another
+    DataSizeArray, an array('Q'), or a NumPy array of integers or strings.
+    '''
+    __slots__ = ('counts',)
+    __hash__ = None  # == compares elementwise
+
+    def __init__(self, values=()):
+        if isinstance(values, DataSizeArray):
+            counts = array('Q', values.counts)
+        elif isinstance(values, array) and values.typecode == 'Q':
+            counts = array('Q', values)
+        elif hasattr(values, 'dtype'):
+            counts = _from_numpy(values)
+        else:
+            counts = DataSize.parse_many(values, output='array')
+        self.counts = counts
+
+    @classmethod
+    def _wrap(cls, counts):
+        '''DataSizeArray around an existing array('Q'), without copying'''
+        instance = cls.__new__(cls)
+        instance.counts = counts
+        return instance
+
+    def to_numpy(self):
+        '''uint64 NumPy array sharing this array's buffer'''
+        import numpy
+        return numpy.frombuffer(self.counts, dtype=numpy.uint64)
+
+    @property
+    def nbytes(self):
+        '''size of the count buffer in bytes'''
+        return len(self.counts) * self.counts.itemsize
+
+    # sequence protocol
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __iter__(self):
+        new = DataSize.interning.new
+        for count in self.counts:
+            yield new(DataSize, count)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._wrap(self.counts[key])
+        if isinstance(key, list):
+            # boolean mask, as returned by the comparisons
+            if len(key) != len(self.counts):
+                raise ValueError("mask of length {} for DataSizeArray of length {}".format(
+                    len(key), len(self.counts)))
+            return self._wrap(array('Q', compress(self.counts, key)))
+        return DataSize.interning.new(DataSize, self.counts[key])
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            self.counts[key] = DataSizeArray(value).counts
+        else:
+            self.counts[key] = _count(value)
+
+    def append(self, value):
+        self.counts.append(_count(value))
+
+    def extend(self, values):
+        self.counts.extend(DataSizeArray(values).counts)
+
+    # reductions
+
+    def sum(self):
+        return DataSize.interning.new(DataSize, sum(self.counts))
+
+    def min(self):
+        return DataSize.interning.new(DataSize, min(self.counts))
+
+    def max(self):
+        return DataSize.interning.new(DataSize, max(self.counts))
+
+    def mean(self):
+        '''mean byte count, as a float'''
+        if not self.counts:
+            raise ValueError("mean() of an empty DataSizeArray")
+        return sum(self.counts) / len(self.counts)
+
+    # formatting
+
+    def format(self, code=''):
+        '''list of str, formatting every element with a DataSize.__format__()
+        code'''
+        return list(map(DataSize.formatter(code), self.counts))
+
+    def __repr__(self):
+        if len(self.counts) > _repr_items:
+            half = _repr_items // 2
+            items = self[:half].format() + ['...'] + self[-half:].format()
+        else:
+            items = self.format()
+        return 'DataSizeArray([{}])'.format(', '.join(
+            item if item == '...' else "'{}'".format(item) for item in items))
+
+    # elementwise arithmetic, returning new arrays
+
+    def _apply(self, function, other, reflected=False):
+        counts = self.counts
+        try:
+            other = _operand(other, len(counts))
+        except TypeError:
+            return NotImplemented
+        if isinstance(other, Real) and not isinstance(other, _integer_types):
+            other = Fraction(other)
+            if other.denominator == 1:
+                other = int(other)
+            else:
+                function = _rounded(function)
+        if isinstance(other, array):
+            if reflected:
+                values = map(function, other, counts)
+            else:
+                values = map(function, counts, other)
+        elif reflected:
+            values = (function(other, count) for count in counts)
+        else:
+            values = (function(count, other) for count in counts)
+        try:
+            return self._wrap(array('Q', values))
+        except OverflowError:
+            raise OverflowError("DataSizeArray counts must be between 0 and 2**64 - 1")
+
+    def __add__(self, other):
+        return self._apply(operator.add, other)
+
+    def __radd__(self, other):
+        return self._apply(operator.add, other, reflected=True)
+
+    def __sub__(self, other):
+        return self._apply(operator.sub, other)
+
+    def __rsub__(self, other):
+        return self._apply(operator.sub, other, reflected=True)
+
+    def __mul__(self, other):
+        return self._apply(operator.mul, other)
+
+    def __rmul__(self, other):
+        return self._apply(operator.mul, other, reflected=True)
+
+    def __floordiv__(self, other):
+        return self._apply(operator.floordiv, other)
+
+    def __mod__(self, other):
+        return self._apply(operator.mod, other)
+
+    # elementwise comparisons, returning lists of bool
+
+    def _compare(self, function, other):
+        counts = self.counts
+        try:
+            other = _operand(other, len(counts))
+        except TypeError:
+            return NotImplemented
+        if isinstance(other, array):
+            return list(map(function, counts, other))
+        return [function(count, other) for count in counts]
+
+    def __eq__(self, other):
+        return self._compare(operator.eq, other)
+
+    def __ne__(self, other):
+        return self._compare(operator.ne, other)
+
+    def __lt__(self, other):
+        return self._compare(operator.lt, other)
+
+    def __le__(self, other):
+        return self._compare(operator.le, other)
+
+    def __gt__(self, other):
+        return self._compare(operator.gt, other)
+
+    def __ge__(self, other):
+        return self._compare(operator.ge, other)
+
+
+def _count(value):
+    '''byte count of a single element'''
+    if type(value) is str or not isinstance(value, (int, __DataSize_super__)):
+        value = DataSize(value)
+    return __DataSize_super__(value)
+
+
+def _rounded(function):
+    '''function whose results, exact with a fractional operand, are
+    rounded to whole bytes'''
+    if function in _rounded_down:
+        return lambda left, right: function(left, right) // 1
+    return lambda left, right: -(-function(left, right) // 1)
+
+
+def _operand(other, length):
+    '''array('Q') of an array operand, the byte count of a spec, or a
+    number of bytes; raises TypeError for anything else'''
+    if isinstance(other, DataSizeArray):
+        other = other.counts
+    if isinstance(other, array):
+        if len(other) != length:
+            raise ValueError("operands of length {} and {}".format(length, len(other)))
+        return other
+    if isinstance(other, (list, tuple)) or getattr(other, 'ndim', 0):
+        return _operand(DataSizeArray(other), length)
+    if isinstance(other, _integer_types):
+        return __DataSize_super__(other)
+    if isinstance(other, Real):
+        # compared as is, and applied exactly by _apply()
+        return other
+    if isinstance(other, (str,) + _buffer_types):
+        return _count(other)
+    raise TypeError("unsupported DataSizeArray operand: '{}'".format(type(other).__name__))
+
+
+def _from_numpy(values):
+    '''array('Q') copy of a NumPy array of integer counts or size strings'''
+    import numpy
+    if values.dtype.kind in 'US':
+        from datasize.numpy import parse_array
+        values = parse_array(values)
+    if values.dtype.kind == 'O':
+        return DataSize.parse_many(values.tolist(), output='array')
+    if values.dtype.kind not in 'iub':
+        raise TypeError("DataSizeArray needs integer byte counts, not {}".format(values.dtype))
+    if values.size and values.dtype.kind == 'i' and values.min() < 0:
+        raise OverflowError("DataSizeArray counts must be between 0 and 2**64 - 1")
+    counts = array('Q')
+    # array.fromstring() on Python 2
+    load = getattr(counts, 'frombytes', None) or counts.fromstring
+    load(numpy.ascontiguousarray(values.ravel(), dtype=numpy.uint64).tobytes())
+    return counts
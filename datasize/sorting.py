@@ -0,0 +1,151 @@
+'''Sorting by data size, like sort -h.
+
+    >>> from datasize import sort_human
+    >>> list(sort_human(['1.5G', '512M', '4.0K']))
+    ['4.0K', '512M', '1.5G']
+    >>> du = ['12G\\t./var', '4.0K\\t./tmp', '1.5G\\t./home']
+    >>> list(sort_human(du, reverse=True))
+    ['12G\\t./var', '1.5G\\t./home', '4.0K\\t./tmp']
+
+Sizes are read as du -h writes them and sort -h orders them, where the
+single letter prefixes K, M, G, ... are powers of 1024, so that 1020K
+comes before 1.0M; cls=DataSize reads them as DataSize() does instead.
+
+Every item is parsed once, to a plain integer sort key, rather than on
+every comparison. Inputs of more than run_size items are sorted in runs
+of run_size that are spilled to temporary files and then merged with
+heapq.merge(), so that only one run, and one block of each spilled run,
+is in memory at a time.
+'''
+from __future__ import absolute_import
+
+from heapq import merge
+from itertools import count, islice
+from operator import itemgetter
+
+from datasize.__datasize__ import DataSize, _integer_types
+from datasize.dialects import du
+from datasize.scanner import _memo_size
+
+# records per pickled block of a spilled run
+_block_size = 4096
+# most runs merged at once; more are first merged in passes
+_max_runs = 128
+
+
+def sort_human(iterable, key=None, reverse=False, cls=du, run_size=1000000,
+               tmpdir=None):
+    '''iterator over the items of iterable in order of size, stable like
+    sorted().
+
+    key:      function giving the size of an item, as a spec or a number;
+              by default the item itself, or the first field of a str
+              item, so that lines of du output sort by their size
+    reverse:  largest first
+    cls:      class of the dialect of the sizes, by default du, or
+              DataSize or another of DataSize.dialects
+    run_size: most items sorted in memory; larger inputs are sorted in
+              runs spilled to temporary files in tmpdir, so their items
+              must be picklable
+    '''
+    if run_size < 1:
+        raise ValueError("run_size must be positive: {}".format(run_size))
+    size = _size_key(key, cls)
+    items = iter(iterable)
+    run = list(islice(items, run_size + 1))
+    if len(run) <= run_size:
+        run.sort(key=size, reverse=reverse)
+        return iter(run)
+
+    # records of (signed size, input position, item) are unique before
+    # the item, so that runs merge stably without comparing items
+    sign = -1 if reverse else 1
+    positions = count()
+    runs = []
+    try:
+        while run:
+            records = [(sign * size(item), next(positions), item) for item in run]
+            records.sort(key=itemgetter(0))
+            runs.append(_spill(records, tmpdir))
+            if len(runs) == _max_runs:
+                runs = [_spill(merge(*map(_records, runs)), tmpdir)]
+            run = list(islice(items, run_size))
+    except BaseException:
+        for spilled in runs:
+            spilled.close()
+        raise
+    return _merged(runs)
+
+
+def _size_key(key, cls):
+    '''function of an item giving its byte count, parsing each distinct
+    spec once'''
+    parse, exact = cls._parse, cls.exact_parsing
+    memo = {}
+
+    def size(item):
+        if key is not None:
+            spec = key(item)
+        elif isinstance(item, str):
+            spec = item.split(None, 1)[0] if item.strip() else item
+        else:
+            spec = item
+        try:
+            return memo[spec]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable, so not memoized
+            return int(cls(spec))
+        if type(spec) is str:
+            value = parse(spec, exact)
+        elif isinstance(spec, _integer_types):
+            value = spec
+        else:
+            value = int(cls(spec))
+        if len(memo) >= _memo_size:
+            memo.clear()
+        memo[spec] = value
+        return value
+
+    return size
+
+
+def _spill(records, tmpdir):
+    '''temporary file holding the records, in pickled blocks, rewound'''
+    # imported here, as most inputs are never spilled
+    import pickle
+    import tempfile
+    spilled = tempfile.TemporaryFile(dir=tmpdir)
+    records = iter(records)
+    block = list(islice(records, _block_size))
+    while block:
+        pickle.dump(block, spilled, pickle.HIGHEST_PROTOCOL)
+        block = list(islice(records, _block_size))
+    spilled.seek(0)
+    return spilled
+
+
+def _records(spilled):
+    '''generator of the records of a spilled run, closing it at the end'''
+    import pickle
+    try:
+        while True:
+            try:
+                block = pickle.load(spilled)
+            except EOFError:
+                return
+            for record in block:
+                yield record
+    finally:
+        spilled.close()
+
+
+def _merged(runs):
+    '''generator of the items of the merged runs'''
+    try:
+        for record in merge(*map(_records, runs)):
+            yield record[2]
+    finally:
+        for spilled in runs:
+            spilled.close()
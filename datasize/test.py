@@ -34,6 +34,692 @@ def test_bug_ticket_regressions():
     assert DataSize('10KiB') == 10240
     assert DataSize('10kiB') == 10240
 
+def test_unit_table_parsing():
+    assert DataSize('1.5kiB') == 1536
+    assert DataSize('3Kbb') == 375 # repeated base unit suffixes are tolerated
+    assert DataSize(' 1e3 ') == 1000
+    try:
+        DataSize('5XB')
+    except ValueError as err:
+        assert str(err) == "'5XB' invalid unit: 'X'"
+    else:
+        raise AssertionError("'5XB' should not parse")
+
+def test_parse_cache():
+    cache = DataSize.parse_cache
+    cache.enable(maxsize=2)
+    try:
+        assert DataSize('512MiB') is DataSize('512MiB')
+        DataSize('1G')
+        DataSize('10GB') # evicts '512MiB'
+        assert DataSize('512MiB', word_length=16) == 512 * 1024**2
+        assert cache.info() == (1, 4, 2, 2, 2)
+        cache.disable()
+        assert DataSize('1G') is not DataSize('1G')
+    finally:
+        cache.disable()
+        cache.clear()
+
+def test_exact_parsing():
+    # integer quantities are always exact
+    assert DataSize('123456789012345678901B') == 123456789012345678901
+    assert DataSize('1.1YiB', exact=True) == 1329818401576092092176794
+    assert DataSize('0.1kb', exact=True) == 13
+    assert DataSize('-1.5e-3GB', exact=True) == -1500000
+    # None, the default, is DataSize.exact_parsing
+    DataSize.exact_parsing = True
+    try:
+        assert DataSize('1.1YiB', exact=None) == 1329818401576092092176794
+        assert DataSize('1.1YiB', exact=False) == DataSize(float(DataSize('1.1YiB')))
+    finally:
+        DataSize.exact_parsing = False
+
+def test_numeric_dispatch():
+    from decimal import Decimal
+    from fractions import Fraction
+    assert DataSize(DataSize('750GB') * 0.8) == 600000000000
+    assert DataSize(10, word_length=4) == 5
+    for spec in (1.5, Decimal('1.5'), Fraction(3, 2)):
+        assert DataSize(spec) == 2
+    assert DataSize(b'1KiB') == 1024
+    assert DataSize.from_bytes(1536) == DataSize('1.5KiB')
+    assert DataSize.from_bytes(b'\x01\x00', 'big') == 256
+    assert DataSize.from_bits(9) == 2
+    assert DataSize.from_bits(9, word_length=4).word_length == 4
+    try:
+        DataSize(['1KiB'])
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("lists are not DataSize specs")
+
+def test_compact_instances():
+    import pickle
+    size = DataSize('1KiB')
+    assert not hasattr(size, '__dict__')
+    wide = DataSize('1KiB', word_length=16)
+    assert wide.word_length == 16 and size.word_length == 8
+    assert isinstance(wide, DataSize) and not hasattr(wide, '__dict__')
+    assert type(wide) is type(DataSize.from_bits(48, word_length=16))
+    for instance in (size, wide):
+        restored = pickle.loads(pickle.dumps(instance))
+        assert restored == instance
+        assert restored.word_length == instance.word_length
+    # pickled by releases before __slots__, with their word_length in a dict
+    for pickled, word_length in (
+            (b'\x80\x02cdatasize.__datasize__\nDataSize\nq\x00M\x00\x04\x85q\x01\x81q\x02'
+             b'}q\x03X\x0b\x00\x00\x00word_lengthq\x04K\x08sb.', 8),
+            (b'\x80\x02cdatasize.__datasize__\nDataSize\nq\x00M\x00\x04\x85q\x01\x81q\x02'
+             b'}q\x03X\x0b\x00\x00\x00word_lengthq\x04K\x10sb.', 16)):
+        restored = pickle.loads(pickled)
+        assert restored == 1024 and isinstance(restored, DataSize)
+        assert restored.word_length == word_length and not hasattr(restored, '__dict__')
+
+def test_interning():
+    try:
+        DataSize.interning.enable(values=['3GiB'])
+        assert DataSize('4KiB') is DataSize(4096) is DataSize.from_bytes(4096)
+        assert DataSize('1GB') is DataSize(10**9)
+        assert DataSize('3GiB') is DataSize(3 * 2**30)
+        assert DataSize(4097) is not DataSize(4097)
+        assert type(DataSize(4, word_length=16)) is not DataSize
+        assert DataSize.parse_many(['64MiB', '64MiB'])[0] is DataSize(2**26)
+        hits, misses, hit_rate, currsize = DataSize.interning.info()
+        assert hits and misses and 0 < hit_rate < 1 and currsize > 1024
+    finally:
+        DataSize.interning.disable()
+        DataSize.interning.clear()
+    assert DataSize(4096) is not DataSize(4096)
+    assert DataSize.interning.info() == (0, 0, 0.0, 0)
+
+def test_datasize_array():
+    from datasize import DataSizeArray
+    sizes = DataSizeArray(['1KiB', '2GB', 3, DataSize('1.5MiB')])
+    assert len(sizes) == 4 and sizes.nbytes == 32
+    assert sizes[1] == 2 * 10**9 and type(sizes[1]) is DataSize
+    assert list(sizes[1:3]) == [2 * 10**9, 3]
+    assert sizes.sum() == 1024 + 2 * 10**9 + 3 + 1536 * 1024
+    assert sizes.min() == 3 and sizes.max() == 2 * 10**9
+    assert sizes.mean() == sizes.sum() / 4.0
+    assert list(sizes + '1KiB') == [2048, 2 * 10**9 + 1024, 1027, 1537 * 1024]
+    assert list(sizes - sizes) == [0] * 4
+    assert list(2 * sizes[:1]) == list(sizes[:1] * 2) == [2048]
+    assert list(sizes // 1024) == [1, 1953125, 0, 1536]
+    assert (sizes > '1MiB') == [False, True, False, True]
+    assert list(sizes[sizes == DataSize(3)]) == [3]
+    halves = DataSizeArray(['1KiB', '2KiB'])
+    assert list(halves * 0.5) == list(0.5 * halves) == [512, 1024]
+    assert list(halves * 1.5) == [1536, 3072]
+    assert list(halves * (1 / 3.0)) == [342, 683]
+    assert list(halves // 2.5) == [409, 819]
+    assert list(halves % 2.5) == [1, 0]
+    assert list(halves * 2.0) == [2048, 4096]
+    assert (halves > 1023.5) == [True, True]
+    assert (halves == 1024.0) == [True, False]
+    assert sizes.format('.1a') == ['1KiB', '1.9GiB', '3B', '1.5MiB']
+    assert repr(sizes[:2]) == "DataSizeArray(['1KiB', '1.862645149230957GiB'])"
+    sizes[0] = '4KiB'
+    sizes.append(7)
+    assert sizes[0] == 4096 and sizes[-1] == 7
+    for bad in (lambda: sizes - '1GiB', lambda: sizes + [1, 2]):
+        try:
+            bad()
+        except (OverflowError, ValueError):
+            pass
+        else:
+            raise AssertionError("DataSizeArray operands must fit and align")
+    try:
+        import numpy
+    except ImportError:
+        return
+    assert list(DataSizeArray(numpy.array(['1KiB', '1MB']))) == [1024, 10**6]
+    assert sizes.to_numpy().tolist() == list(sizes)
+
+def test_typed_arithmetic():
+    one, half = DataSize('1GiB'), DataSize('512MiB')
+    assert type(one + half) is not DataSize
+    try:
+        DataSize.arithmetic.enable()
+        for result in (one + half, 1 + one, one - half, one * 2, 2 * one, one // 3,
+                       one % 7, -one, abs(-one), sum([one, half])):
+            assert type(result) is DataSize
+        assert '{:.1GiB}'.format(one + half) == '1.5GiB'
+        assert type(one / 2) is float and type(one + 0.5) is float
+        wide = DataSize(4, word_length=16)
+        assert (wide * 2).word_length == 16
+    finally:
+        DataSize.arithmetic.disable()
+    assert type(one + half) is not DataSize
+    assert DataSize.sum([one, half, 1]) == 3 * 2**29 + 1
+    assert type(DataSize.sum([])) is DataSize
+
+def test_scan():
+    from datasize import scan
+    lines = ['copied 1.4GiB in 3s', 'java -Xmx2g -Xms512m', 'no sizes, 42 or 1.4 GiB',
+             '10GB. 4KiB/s 1e3KB x86_64 v1.2.3GB']
+    found = [(line_no, lines[line_no - 1][begin:end], size)
+             for line_no, (begin, end), size in scan(lines)]
+    assert found == [(1, '1.4GiB', DataSize('1.4GiB')), (2, '2g', 2 * 1024**3),
+                     (2, '512m', 512 * 1024**2), (4, '10GB', 10**10),
+                     (4, '4KiB', 4096), (4, '1e3KB', 10**6)]
+    assert all(type(size) is DataSize for _, _, size in found)
+    assert [line_no for line_no, _, _ in scan('1KB\n\n2KB', start=0)] == [0, 2]
+    # beyond float, so not a size
+    assert list(scan(['weird 1e400KB token'])) == []
+
+def test_scan_file():
+    import os, tempfile
+    from array import array
+    from datasize.scanner import scan_file, scan_file_into
+    text = 'copied 1.4GiB in 3s\njava -Xmx2g 1e400KB\n\n4KiB x86_64 1e3KB\n'
+    descriptor, path = tempfile.mkstemp()
+    try:
+        with os.fdopen(descriptor, 'wb') as stream:
+            stream.write(text.encode('ascii'))
+        tokens = list(scan_file(path))
+        assert [text[offset:].split()[0] for offset, _ in tokens] == [
+            '1.4GiB', '2g', '4KiB', '1e3KB']
+        assert [count for _, count in tokens] == [int(DataSize(token)) for token in
+                                                   ('1.4GiB', '2g', '4KiB', '1e3KB')]
+        counts, offsets = array('Q', [0] * 3), array('Q', [0] * 3)
+        filled, resume = scan_file_into(path, counts, offsets)
+        assert filled == 3 and list(offsets) == [offset for offset, _ in tokens[:3]]
+        filled, resume = scan_file_into(path, counts, start=resume)
+        assert filled == 1 and counts[0] == 10**6
+        assert scan_file_into(path, counts, start=resume)[0] == 0
+        # beyond 64 bits, so skipped
+        with open(path, 'wb') as stream:
+            stream.write(b'1KB 100YB 2KB 100YB')
+        assert scan_file_into(path, counts) == (2, 19) and list(counts[:2]) == [1000, 2000]
+        try:
+            import numpy
+        except ImportError:
+            pass
+        else:
+            buffer = numpy.zeros(3, dtype=numpy.uint64)
+            assert scan_file_into(path, buffer) == (2, 19)
+            assert buffer.tolist() == [1000, 2000, 0]
+        with open(path, 'wb'):
+            pass
+        assert list(scan_file(path)) == []
+    finally:
+        os.remove(path)
+
+def test_buffer_specs():
+    from array import array
+    field = bytearray(b'size=14GiB;')
+    assert DataSize(memoryview(field)[5:10]) == DataSize('14GiB')
+    assert DataSize(bytearray(b' 1.5KiB ')) == 1536
+    assert DataSize(memoryview(b'1xKxB')[::2]) == 1000
+    assert DataSize(array('b', b'2MB')) == 2 * 10**6
+    assert DataSize(b'1KiB', word_length=16) == 1024
+    for spec, error in ((b'\xff1KB', ValueError), (array('Q', [1]), TypeError)):
+        try:
+            DataSize(spec)
+        except error:
+            pass
+        else:
+            raise AssertionError("{!r} is not a DataSize spec".format(spec))
+
+def test_parallel_parse_file():
+    import os, tempfile
+    from datasize import parallel
+    rows = ['name,size'] + ['f{},{}KiB'.format(n, n % 7 + 1) for n in range(200)]
+    rows[50] = '"a, quoted name",2MiB'
+    rows[120] = 'f119,oops'
+    descriptor, path = tempfile.mkstemp(suffix='.csv')
+    minimum = parallel._min_parallel_bytes
+    try:
+        with os.fdopen(descriptor, 'w') as stream:
+            stream.write('\n'.join(rows) + '\n')
+        expected = [int(DataSize(row.rsplit(',', 1)[1])) for row in rows[1:] if 'oops' not in row]
+        for parallel._min_parallel_bytes in (minimum, 0):
+            sizes, failures = parallel.parse_file(path, column=1, header=True, workers=3,
+                                                  errors='collect')
+            assert list(sizes) == expected
+            assert [(failure.index, failure.spec) for failure in failures] == [(120, 'oops')]
+            assert parallel.parse_file(path, column=-1, header=True, workers=3, errors='skip',
+                                       reduce='sum') == sum(expected)
+            histogram = parallel.parse_file(path, column=1, header=True, workers=3,
+                                            errors='skip', reduce='histogram', bins=['4KiB'])
+            assert histogram == [sum(1 for n in expected if n < 4096),
+                                 sum(1 for n in expected if n >= 4096)]
+        try:
+            parallel.parse_file(path, column=1, header=True, workers=2)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("'oops' is not a size")
+    finally:
+        parallel._min_parallel_bytes = minimum
+        os.remove(path)
+
+def test_aio_scan():
+    if sys.version_info < (3, 6):
+        return
+    import asyncio
+    from datasize import aio, scan
+    lines = ['copied {}MiB of 2GiB in 3s'.format(n) for n in range(50)] + ['no size', 'tail 1KB']
+    text = '\n'.join(lines)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        for batch_size in (1024, 2):
+            reader = asyncio.StreamReader()
+            reader.feed_data(text.encode('ascii'))
+            reader.feed_eof()
+            tokens = aio.scan(reader, chunk_size=100, batch_size=batch_size)
+            found = []
+            while True:
+                try:
+                    found.append(loop.run_until_complete(tokens.__anext__()))
+                except StopAsyncIteration:
+                    break
+            assert found == list(scan(lines))
+        # a dialect crosses to worker processes by its name
+        from concurrent.futures import ProcessPoolExecutor
+        import datasize.dialects
+        kubernetes = DataSize.dialects['kubernetes']
+        pods = ['limit {}Mi request 500m'.format(n) for n in range(10)]
+        executor = ProcessPoolExecutor(max_workers=1)
+        try:
+            reader = asyncio.StreamReader()
+            reader.feed_data('\n'.join(pods).encode('ascii'))
+            reader.feed_eof()
+            tokens = aio.scan(reader, batch_size=2, executor=executor, cls=kubernetes)
+            found = []
+            while True:
+                try:
+                    found.append(loop.run_until_complete(tokens.__anext__()))
+                except StopAsyncIteration:
+                    break
+            assert found == list(scan(pods, cls=kubernetes))
+            assert all(type(size) is kubernetes for _, _, size in found)
+        finally:
+            executor.shutdown()
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+def test_try_parse():
+    assert DataSize.try_parse('1.5KiB') == (1536, None)
+    assert type(DataSize.try_parse(b'2KB')[0]) is DataSize
+    assert DataSize.try_parse('1K', word_length=16)[0].word_length == 16
+    for spec, position in (('junk', 0), ('12 GB', 2), ('  x1GB', 2), ('', 0), ('GB', 0),
+                           ('1.2.3GB', 0), ('1e400GB', 0), (b'\xff1K', 0), ([1], None)):
+        size, invalid = DataSize.try_parse(spec)
+        assert size is None and invalid.spec == spec and invalid.position == position
+        assert invalid.reason
+        try:
+            DataSize(spec)
+        except (ValueError, TypeError, OverflowError):
+            pass
+        else:
+            raise AssertionError("{!r} parses, but try_parse() rejects it".format(spec))
+
+def test_expressions():
+    from datasize import expr
+    assert expr.evaluate('2GiB + 512MiB') == 2560 * 1024**2
+    heap = expr.compile('(total - 512MiB) * ratio')
+    assert heap is expr.compile('(total - 512MiB) * ratio')
+    assert heap.names == frozenset(['total', 'ratio'])
+    assert heap(total='4GiB', ratio=0.5) == 1792 * 1024**2
+    assert heap({'total': DataSize('8GiB')}, ratio=0.25) == 1920 * 1024**2
+    assert expr.evaluate('10GB * 0.8') == 8 * 10**9
+    assert expr.evaluate('-(1KiB / 3) + .5KiB') == 171
+    assert type(expr.evaluate('1GB / 3')) is DataSize
+    for source in ('2GiB +', '(1GB', '1GB)', '2 ** 3', '1GB $', '', '2 GiB', '1e400KB'):
+        try:
+            expr.evaluate(source)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("'{}' is not an expression".format(source))
+    try:
+        heap(total='1GiB')
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("ratio is not bound")
+    share = expr.compile('total / n')
+    for divide in (lambda: expr.compile('1GB/0'), lambda: expr.evaluate('1GB / (2 - 2)'),
+                   lambda: share(total='1GB', n=0), lambda: share(total='1GB', n=0.0)):
+        try:
+            divide()
+        except ValueError as err:
+            assert str(err).startswith('division by zero in ')
+        else:
+            raise AssertionError('division by zero')
+
+def test_data_rates():
+    from datetime import timedelta
+    from datasize import DataRate
+    from datasize.rate import transfer_sizes, transfer_times
+    assert DataRate('MB/s') == 10**6
+    assert DataRate('Gbps') == DataRate('1Gbit/s') == 125 * 10**6
+    assert DataRate('8Mib/s') == 1024**2
+    assert DataRate('3.6GiB/h') == 3.6 * 1024**3 / 3600
+    assert DataRate(b'2kB/min') * timedelta(minutes=1) == 2000
+    assert DataRate('1MB/ms') == DataRate('1GB/s') == 10**9
+    assert DataRate('60GB/hours') == DataRate('1GB/mins') == DataRate('1GB/min')
+    rate = DataRate('1GiB/h')
+    assert rate * timedelta(minutes=30) == DataSize('512MiB')
+    assert type(rate * 1) is DataRate and type(rate + rate) is DataRate
+    # a number scales the rate, as it does dividing
+    link = DataRate('1Gbps')
+    assert link * 0.8 == 0.8 * link == DataRate('800Mbps') and type(link * 0.8) is DataRate
+    assert link * 2 == DataRate('2Gbps') and type(link / 2) is DataRate
+    assert DataSize('30GB') / DataRate('1Gbps') == 240.0
+    assert '{:.2a}'.format(DataRate('10Gbps')) == '1.16GiB/s'
+    assert '{:.1MiB/min}'.format(DataRate('512MiB/h')) == '8.5MiB/min'
+    assert '{:Mbps}'.format(DataRate('1Gbps')) == '1000Mbps'
+    assert '{:.2a}'.format(DataRate('1.5B/s')) == '1.50B/s'
+    assert '{:.1B}'.format(DataRate('0.5B/s')) == '0.5B/s'
+    assert '{:.1MB/ms}'.format(DataRate('1.5GB/s')) == '1.5MB/ms'
+    for spec in ('1GB', '1GB/fortnight', '1XB/s', '1 GB/s', '1GB/hs', '1GB/ds'):
+        try:
+            DataRate(spec)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("'{}' is not a rate".format(spec))
+    try:
+        DataSize('1GB') * rate
+    except TypeError:
+        pass
+    else:
+        raise AssertionError('a size times a rate is not a size')
+    assert list(transfer_times(['30GB', 10**9], ['1Gbps', 0])) == [240.0, float('inf')]
+    assert list(transfer_times(['30GB', '1TB'], '1Gbps')) == [240.0, 8000.0]
+    assert list(transfer_sizes(['1MB/s', '1kB/s'], 10)) == [10**7, 10**4]
+    assert list(transfer_sizes('1kB/s', [1, timedelta(minutes=1)])) == [1000, 60000]
+
+def test_dialects():
+    import pickle
+    from datasize import scan
+    dialects = DataSize.dialects
+    disk = dialects.register('test-disk', units={'sector': 512, 'page': 4096})
+    jedec = dialects.register('test-jedec', prefixes={'K': 1024, 'M': 1024**2})
+    bare = dialects.register('test-bare', prefixes={'Ki': 1024}, base=None)
+    try:
+        assert DataSize('8sector', dialect='test-disk') == disk('8sector') == 4096
+        assert type(disk('2page')) is disk and disk('1GiB') == 1024**3
+        assert jedec('1KB') == 1024 and DataSize('1KB') == 1000
+        assert '{:KB}'.format(jedec(2048)) == '2KB'
+        assert bare('4Ki') == 4096
+        for dialect, spec in ((DataSize, '1sector'), (bare, '1G'), (jedec, '1sector')):
+            try:
+                dialect(spec)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError("'{}' is not a {} size".format(spec, dialect.dialect))
+        restored = pickle.loads(pickle.dumps(disk('3sector')))
+        assert restored == 1536 and type(restored) is disk
+        assert [size for _, _, size in scan(['8sector, 2page'], cls=disk)] == [4096, 8192]
+        assert disk.parse_many(['1sector', '1page']) == [512, 4096]
+        assert DataSize.try_parse('8sector', dialect='test-disk') == (4096, None)
+        size, _ = DataSize.try_parse(b'2KB', word_length=16, dialect='test-jedec')
+        assert size == 2048 and size.word_length == 16 and size.dialect == 'test-jedec'
+        assert DataSize.try_parse('1sector')[1].position == 1
+        assert DataSize.try_parse('1500m', dialect='kubernetes') == (2, None)
+        for ambiguous in ({'units': {'K': 1}}, {'prefixes': {'KB': 5}}):
+            try:
+                dialects.register('test-ambiguous', **ambiguous)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError('{} is ambiguous'.format(ambiguous))
+        try:
+            dialects.register('test-disk')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('test-disk is already registered')
+        try:
+            DataSize('1K', dialect='test-unknown')
+        except KeyError:
+            pass
+        else:
+            raise AssertionError('test-unknown is not registered')
+    finally:
+        for name in ('test-disk', 'test-jedec', 'test-bare'):
+            dialects.unregister(name)
+    assert not [name for name in dialects if name.startswith('test-')]
+
+def dialect_corpus_check(parser, corpus, invalid):
+    for spec, expected in corpus:
+        assert parser(spec) == expected, (parser, spec, parser(spec), expected)
+        assert DataSize(spec, dialect=parser.name) == expected
+    for spec in invalid:
+        try:
+            parser(spec)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("'{}' is not a {} size".format(spec, parser.name))
+
+def test_kubernetes_dialect():
+    from datasize.dialects import kubernetes
+    corpus = [('128Mi', 128 * 1024**2), ('1Gi', 1024**3), ('1G', 10**9), ('2k', 2000),
+              ('1E', 10**18), ('1e3', 1000), ('1E3', 1000), ('1.5e1', 15), ('1e-3', 1),
+              ('1500m', 2), ('500m', 1), ('100u', 1), ('5n', 1), ('0', 0), ('.5Gi', 2**29),
+              ('1.', 1), ('+1Ki', 1024), ('-1.5', -2), ('123456789012345678901', 123456789012345678901)]
+    invalid = ['1KiB', '1K', '1ki', '1Gi ', ' 1Gi', '1 Gi', 'Gi', '1e', '1e3Mi', '', '1.2.3',
+               '1e1000']
+    dialect_corpus_check(kubernetes, corpus, invalid)
+    assert [kubernetes.format(size) for size in (0, 3, 1000, 1024, 2048000, 10**9)] == [
+        '0', '3', '1k', '1Ki', '2000Ki', '1G']
+    pod = {'spec': {'containers': [{'resources': {
+        'limits': {'memory': '1Gi', 'cpu': '500m', 'hugepages-2Mi': '100Mi'},
+        'requests': {'memory': 268435456, 'ephemeral-storage': '2G'}}}]}}
+    resources = kubernetes.convert(pod)['spec']['containers'][0]['resources']
+    assert resources['limits'] == {'memory': 1024**3, 'cpu': '500m', 'hugepages-2Mi': 100 * 1024**2}
+    assert resources['requests'] == {'memory': 2**28, 'ephemeral-storage': 2 * 10**9}
+    assert pod['spec']['containers'][0]['resources']['limits']['memory'] == '1Gi'
+    assert kubernetes.parse_many(['1Gi', '1GiB', '1Gi'], errors='skip') == [1024**3] * 2
+
+def test_jvm_dialect():
+    from datasize.dialects import jvm
+    corpus = [('2g', 2 * 1024**3), ('2G', 2 * 1024**3), ('512m', 2**29), ('64k', 65536),
+              ('1t', 1024**4), ('4096', 4096), ('0x10k', 16384), ('0X1F', 31),
+              ('-Xmx2g', 2 * 1024**3), ('-Xss1m', 2**20), ('-XX:MaxMetaspaceSize=256m', 2**28)]
+    invalid = ['1.5g', '2gb', '2GB', '1kk', '2 g', '-1', '', 'g', '0x', '16777216t',
+               '18446744073709551616', '-Xmx']
+    dialect_corpus_check(jvm, corpus, invalid)
+    assert jvm.format(2**31) == '2g' and jvm.format(1536) == '1536'
+    assert jvm.convert('java -Xms512m -Xmx2g -XX:+UseG1GC -XX:MaxMetaspaceSize=256m '
+                       '-Xmx3g -jar app.jar') == {'-Xms': 2**29, '-Xmx': 3 * 1024**3,
+                                                  '-XX:MaxMetaspaceSize': 2**28}
+
+def test_systemd_dialect():
+    from datasize.dialects import systemd
+    corpus = [('4G', 4 * 1024**3), ('MemoryMax=4G', 4 * 1024**3), ('1024', 1024),
+              ('1024B', 1024), ('1 K', 1024), ('+5K', 5120), ('1G 512M', 1536 * 1024**2),
+              ('1.5G', 1536 * 1024**2), ('10.M', 10 * 1024**2), ('0.3K', 307),
+              ('1E', 1024**6), ('1B 1', 2), ('infinity', 2**64 - 1)]
+    invalid = ['1KB', '1Ki', '1k', '512M 1G', '1G 1G', '1 1', '-1', '', '1K ', '50%', '16E',
+               'Infinity']
+    dialect_corpus_check(systemd, corpus, invalid)
+    assert systemd.format(2**64 - 1) == 'infinity' and systemd.format(2**32) == '4G'
+    unit = '\n'.join(['[Service]', 'MemoryMax=4G', 'MemoryHigh=3G', 'MemoryHigh=',
+                      '# MemoryLow=1G', 'MemorySwapMax=infinity', 'CPUQuota=50%'])
+    assert systemd.convert(unit) == {'MemoryMax': 4 * 1024**3, 'MemorySwapMax': 2**64 - 1}
+
+def test_docker_dialect():
+    from datasize.dialects import docker
+    corpus = [('512m', 2**29), ('512M', 2**29), ('512mb', 2**29), ('512MiB', 2**29),
+              ('512 m', 2**29), ('1.5k', 1536), ('1.5 GB', 1536 * 1024**2), ('100', 100),
+              ('100b', 100), ('0.5', 0), ('2i', 2), ('--memory=512m', 2**29), ('-1', -1),
+              ('--memory-swap=-1', -1)]
+    invalid = ['1.2.3', '512  m', '512x', 'm', '', '--memory', '-2', '1e3', '.5g',
+               '--memory-swap=-2']
+    dialect_corpus_check(docker, corpus, invalid)
+    compose = {'services': {'web': {'mem_limit': '512m', 'memswap_limit': -1, 'shm_size': '64m',
+                                    'deploy': {'resources': {'limits': {
+                                        'memory': '1g', 'cpus': '0.5'}}}}}}
+    web = docker.convert(compose)['services']['web']
+    assert (web['mem_limit'], web['memswap_limit'], web['shm_size']) == (2**29, -1, 2**26)
+    assert web['deploy']['resources']['limits'] == {'memory': 1024**3, 'cpus': '0.5'}
+    assert docker.convert('docker run -m 512m --memory-swap=-1 --shm-size 1g nginx') == {
+        '-m': 2**29, '--memory-swap': -1, '--shm-size': 1024**3}
+
+def test_sort_human():
+    from datasize import sort_human, sorting
+    du = ['4.0K\t./tmp', '12G\t./var', '1.5G\t./home', '4.0K\t./etc', '0\t./run', '512M\t./opt']
+    ascending = ['0\t./run', '4.0K\t./tmp', '4.0K\t./etc', '512M\t./opt', '1.5G\t./home',
+                 '12G\t./var']
+    descending = ['12G\t./var', '1.5G\t./home', '512M\t./opt', '4.0K\t./tmp', '4.0K\t./etc',
+                  '0\t./run']
+    assert list(sort_human(du)) == ascending
+    assert list(sort_human(du, reverse=True)) == descending
+    # K, M and G are binary, as in du -h and sort -h
+    assert list(sort_human(['1.0M\t./a', '1020K\t./b'])) == ['1020K\t./b', '1.0M\t./a']
+    assert list(sort_human(['1.0M', '1020K'], cls=DataSize)) == ['1.0M', '1020K']
+    assert sorting.du('1.5K') == 1536 and sorting.du('1kB') == 1000
+    assert list(sort_human([3, '1K', DataSize(5), b'2B'])) == [b'2B', 3, 5, '1K']
+    jobs = [{'size': '1GiB'}, {'size': '1MiB'}]
+    assert list(sort_human(jobs, key=lambda job: job['size'])) == jobs[::-1]
+    kubernetes = DataSize.dialects['kubernetes']
+    assert list(sort_human(['1Gi', '128Mi', '500m'], cls=kubernetes)) == ['500m', '128Mi', '1Gi']
+    max_runs = sorting._max_runs
+    sorting._max_runs = 2  # merge in passes, too
+    try:
+        for run_size in (1, 2, 5):
+            assert list(sort_human(du, run_size=run_size)) == ascending
+            assert list(sort_human(du, reverse=True, run_size=run_size)) == descending
+            assert list(sort_human(iter(jobs), key=lambda job: job['size'],
+                                   run_size=run_size)) == jobs[::-1]
+    finally:
+        sorting._max_runs = max_runs
+    try:
+        sort_human(['1G', 'junk'])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("'junk' is not a size")
+
+def test_lazy_imports():
+    # a fresh interpreter, as the other tests have imported everything
+    import subprocess
+    check = ("import sys, datasize; "
+             "print(sorted(set(sys.argv[1:]) & set(sys.modules))); "
+             "print(datasize.DataSize('1K', dialect='du'), datasize.DataRate)")
+    modules = ['datasize.sorting', 'datasize.scanner', 'datasize.rate', 'datasize.sizearray',
+               'datasize.dialects', 'tempfile', 'pickle', 'fractions']
+    output = subprocess.check_output([sys.executable, '-c', check] + modules)
+    assert output.decode().splitlines() == [
+        '[]', "1024 <class 'datasize.rate.DataRate'>"]
+
+def test_parse_many():
+    from array import array
+    sizes = DataSize.parse_many(['512MiB', '1GiB', '512MiB'])
+    assert sizes == [512 * 1024**2, 1024**3, 512 * 1024**2]
+    assert sizes[0] is sizes[2]
+    assert DataSize.parse_many(['1KiB', 2.5], output='int') == [1024, 3]
+    results, failures = DataSize.parse_many(
+        ['1K', 'junk', '-1K', '1K'], output='array', errors='collect')
+    assert results == array('Q', [1000, 1000])
+    assert [(f.index, f.spec, f.position) for f in failures] == [(1, 'junk', 0),
+                                                                (2, '-1K', None)]
+    assert DataSize.parse_many(['1K', 'junk'], errors='skip') == [1000]
+    try:
+        DataSize.parse_many(['1K', 'junk'])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("'junk' should not parse")
+
+def test_numpy_parse_array():
+    try:
+        import numpy
+    except ImportError:
+        return
+    from datasize.numpy import parse_array
+    specs = ['14GiB', '512MiB', '1.5kB', '25Mb', '.5K', ' 2G ', '3Kbb', '1.1YiB']
+    parsed = parse_array(numpy.array(specs))
+    assert parsed.dtype == object # '1.1YiB' does not fit in 64 bits
+    assert parsed.tolist() == [DataSize(s) for s in specs]
+    parsed = parse_array(numpy.array([s.encode('ascii') for s in specs[:-1]]).reshape(7, 1))
+    assert parsed.dtype == numpy.uint64 and parsed.shape == (7, 1)
+    assert parsed[:, 0].tolist() == [DataSize(s) for s in specs[:-1]]
+    try:
+        parse_array(numpy.array(['1K', '5X']))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("'5X' should not parse")
+    # dialects with a syntax of their own parse every row with it
+    import datasize.dialects
+    for name, specs in (('docker', ['0.5', '2.7', '1.5k']), ('systemd', ['0.3K', '1K']),
+                        ('kubernetes', ['1500m', '1Gi', '1e3'])):
+        dialect = DataSize.dialects[name]
+        assert parse_array(specs, cls=dialect).tolist() == [dialect(s) for s in specs]
+
+def test_numpy_format_array():
+    try:
+        import numpy
+    except ImportError:
+        return
+    from datasize.numpy import format_array
+    sizes = [0, 1, 512, 1000, 1024, 1536, 750 * 10**9, 2**64 - 1]
+    for code in ('', 'A', 'm', '.2Ib', '.3a', '020.3GiB', '.2GB', 'kb'):
+        expected = ['{{:{}}}'.format(code).format(DataSize(n)) for n in sizes]
+        assert format_array(numpy.array(sizes, dtype=numpy.uint64), code).tolist() == expected
+        assert format_array(numpy.array(sizes, dtype=object), code).tolist() == expected
+    assert format_array(numpy.array([[1024], [2048]]), 'I').shape == (2, 1)
+    DataSize.exact_formatting = True
+    try:
+        sizes = numpy.array([10**24 + 1, 1536, 0, 2**70 + 3], dtype=object)
+        for code in ('.3a', '', 'b', '.1GiB'):
+            expected = ['{{:{}}}'.format(code).format(DataSize(n)) for n in sizes]
+            assert format_array(sizes, code).tolist() == expected
+        assert format_array(sizes[:1], '.3a').tolist() == ['1.000YB']
+    finally:
+        DataSize.exact_formatting = False
+
+def test_formatter():
+    gib = DataSize.formatter('.2GiB')
+    assert gib is DataSize.formatter('.2GiB')
+    assert gib(DataSize('750GB')) == '698.49GiB'
+    assert gib(DataSize('2GiB')) == '2GiB'
+    auto = DataSize.formatter('.3a')
+    for size in (0, 999, 1000, 1024, 1536, 10**27):
+        assert auto(DataSize(size)) == '{:.3a}'.format(DataSize(size))
+    assert DataSize.formatter('b')(DataSize.from_bits(48, word_length=16)) == '48b'
+
+def test_autoformat_unit_selection():
+    for code in ('a', 'A', 'm', 'I'):
+        compiled = DataSize.formatter(code)
+        assert compiled.select(0) == compiled.select(-1) == 0
+        for index, denomination in enumerate(compiled.denominations[:5]):
+            assert compiled.select(denomination - 1) == index
+            assert compiled.select(denomination) == index + 1
+    # selection follows the float arithmetic of the formatted value
+    assert '{:a}'.format(DataSize(2**60 - 1)) == '1EiB'
+    assert '{:m}'.format(DataSize(10**24)) == '1YB'
+
+def test_exact_formatting():
+    exact = DataSize.formatter('.3EB', exact=True)
+    assert exact(DataSize('0.1Eb')) == '0.012EB' # 0.0125 rounds half to even
+    assert DataSize.formatter('.3EB', exact=True, rounding='ceiling')(
+        DataSize('4Pb')) == '0.001EB'
+    assert DataSize.formatter('.3EB', exact=True)(DataSize('4Pb')) == '0.000EB'
+    big = DataSize('1.1YiB', exact=True)
+    assert DataSize.formatter('.3YiB', exact=True)(big) == '1.100YiB'
+    assert DataSize.formatter('.24YiB', exact=True)(big) == '1.100000000000000000000000YiB'
+    assert DataSize.formatter('.25YiB', exact=True)(big) == '1.1000000000000000000000003YiB'
+    assert DataSize.formatter('.2a', exact=True)(DataSize('750GB')) == '698.49GiB'
+    assert DataSize.formatter('.2m', exact=True)(DataSize('750GB')) == '750GB'
+    assert DataSize.formatter('m', exact=True)(DataSize(10**27 + 1)) == '1000.000000000000000000000001YB'
+    assert DataSize.formatter('', exact=True)(DataSize(1536)) == '1.5KiB'
+    assert DataSize.formatter('.0GiB', exact=True)(DataSize('1.5GiB')) == '2GiB'
+    assert DataSize.formatter('020.3GiB', exact=True)(DataSize('750GB')) == '0000000000000698.492GiB'
+    loss = DataSize(-750 * 10**9)
+    assert DataSize.formatter('.2GiB', exact=True)(loss) == '-698.49GiB'
+    assert DataSize.formatter('.3GiB', exact=True, rounding='ceiling')(loss) == '-698.491GiB'
+    assert DataSize.formatter('.1GiB', exact=True, rounding='ceiling')(DataSize(-1)) == '0.0GiB'
+
 example_values = (1, 2, 4, 16, 64, 1024, 65536, 0.1, 0.25, 0.125, 56.65)
 prefixes = list(DataSize.unit_prefixes.keys())
 bases = ('B','b')